@@ -0,0 +1,149 @@
+import hashlib
+import inspect
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+MARKDOWN_EXTENSIONS = ('.md', '.mdx')
+
+# A stage of the migration pipeline: rewrite(filepath, content, log_entries) returns the migrated content and adds
+# a log entry for every change. The log entries of a stage are written to its log_path.
+Stage = namedtuple('Stage', ['name', 'rewrite', 'log_path'])
+
+# all registered stages, in the order they are applied
+STAGES = {}
+
+def register_stage(name, log_path):
+    """Registers the decorated rewrite function as a stage of the migration pipeline, see Stage."""
+    def register(rewrite):
+        STAGES[name] = Stage(name, rewrite, log_path)
+        return rewrite
+    return register
+
+def find_markdown_files(directory):
+    """Returns the paths of all Markdown files in the directory tree, sorted so every run processes them in the same order."""
+    filepaths = []
+    for root, _, files in os.walk(directory):
+        for filename in files:
+            if filename.endswith(MARKDOWN_EXTENSIONS):
+                filepaths.append(os.path.join(root, filename))
+    return sorted(filepaths)
+
+def file_fingerprint(filepath, previous=None):
+    """
+    Returns the sha256, mtime and size of a file. If the mtime and size are the same as in the previous
+    fingerprint, the file is not opened and the previous fingerprint is returned.
+    """
+    stat = os.stat(filepath)
+    if previous and previous['mtime_ns'] == stat.st_mtime_ns and previous['size'] == stat.st_size:
+        return previous
+    with open(filepath, 'rb') as file:
+        digest = hashlib.sha256(file.read()).hexdigest()
+    return {'sha256': digest, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+def migration_version(stages):
+    """Returns a hash of the stages and the scripts which define them, a cache is only valid for the same migration."""
+    digest = hashlib.sha256()
+    for stage in stages:
+        digest.update(stage.name.encode('utf-8'))
+        with open(inspect.getsourcefile(stage.rewrite), 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+def apply_stages(filepath, stages, dry_run=False):
+    """
+    Reads the file once, passes its content through all stages in order, and writes it once if any stage changed
+    it. Returns the log entries of every stage.
+    """
+    with open(filepath, 'r', encoding='utf-8') as file:
+        content = file.read()
+
+    log_entries = {}
+    new_content = content
+    for stage in stages:
+        log_entries[stage.name] = []
+        new_content = stage.rewrite(filepath, new_content, log_entries[stage.name])
+
+    # files are only written if they changed, so the mtime of the unchanged files stays the same
+    if new_content != content and not dry_run:
+        with open(filepath, 'w', encoding='utf-8') as file:
+            file.write(new_content)
+    return log_entries
+
+def collect_log_entries(stages, filepath, cached=None, dry_run=False):
+    """
+    Runs the stages on a single file and returns the log entries of every stage, the fingerprint of the file
+    afterwards, and whether the file was skipped because it has the same content as in the cached fingerprint.
+    """
+    fingerprint = file_fingerprint(filepath, cached)
+    if cached and fingerprint['sha256'] == cached['sha256']:
+        return {}, fingerprint, True
+
+    log_entries = apply_stages(filepath, stages, dry_run)
+    # the file is only read again if it was rewritten
+    return log_entries, file_fingerprint(filepath, fingerprint), False
+
+def load_cache(cache_path, version):
+    """Returns the fingerprints of the files of the last run, if it was done with the same version of the migration."""
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    with open(cache_path, 'r', encoding='utf-8') as cache_file:
+        cache = json.load(cache_file)
+    return cache['files'] if cache.get('version') == version else {}
+
+def run_migration(directory, stages, jobs=None, cache_path=None, dry_run=False):
+    """
+    Runs the stages on every Markdown file in the directory tree, and writes the log entries of every stage to
+    its log_path. Every file is read and written at most once, no matter how many stages are applied.
+
+    The files are spread over a pool of `jobs` processes (default: number of CPUs). The log entries are
+    merged in the order of the files, so the log is the same no matter which process finishes first.
+
+    With a cache_path, the fingerprints of all files are stored after the run. Files which did not change since
+    then are skipped on the next run, without running the stages on them.
+    With dry_run, the planned changes are printed, and neither the files, the logs, nor the cache are written.
+    """
+    filepaths = find_markdown_files(directory)
+    jobs = jobs or os.cpu_count() or 1
+    version = migration_version(stages)
+    cache = load_cache(cache_path, version)
+    cached = [cache.get(filepath) for filepath in filepaths]
+    collect = partial(collect_log_entries, stages, dry_run=dry_run)
+
+    if jobs > 1 and len(filepaths) > 1:
+        # a few chunks per process keeps the processes busy without sending every file separately
+        chunksize = max(1, len(filepaths) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(collect, filepaths, cached, chunksize=chunksize))
+    else:
+        results = [collect(filepath, cached_fingerprint) for filepath, cached_fingerprint in zip(filepaths, cached)]
+
+    log_entries = {}
+    for stage in stages:
+        log_entries[stage.name] = [entry for file_entries, _, _ in results for entry in file_entries.get(stage.name, [])]
+    skipped = sum(1 for _, _, file_skipped in results if file_skipped)
+
+    if dry_run:
+        for stage in stages:
+            for entry in log_entries[stage.name]:
+                print(entry)
+            print(f"Dry run: {len(log_entries[stage.name])} change(s) planned for {stage.log_path}")
+        print(f"Skipped {skipped} unchanged file(s), nothing written")
+        return log_entries
+
+    for stage in stages:
+        os.makedirs(os.path.dirname(stage.log_path) or '.', exist_ok=True)
+        with open(stage.log_path, 'w', encoding='utf-8') as log_file:
+            for entry in log_entries[stage.name]:
+                log_file.write(entry + '\n')
+        print(f"Logged {len(log_entries[stage.name])} change(s) to {stage.log_path}")
+
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+        with open(cache_path, 'w', encoding='utf-8') as cache_file:
+            files = {filepath: fingerprint for filepath, (_, fingerprint, _) in zip(filepaths, results)}
+            json.dump({'version': version, 'files': files}, cache_file, indent=2)
+        print(f"Skipped {skipped} unchanged file(s)")
+    return log_entries
@@ -0,0 +1,27 @@
+import os
+import argparse
+
+# importing the migrations registers their stages, in the order they are applied
+import replace_images  # noqa: F401
+import replace_commands  # noqa: F401
+from docs_migration import STAGES, run_migration
+
+LOG_DIR = 'changelog'
+CACHE_FILENAME = 'docs_migration.cache.json'
+CACHE_PATH = os.path.join(LOG_DIR, CACHE_FILENAME)
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply the docs migrations to Markdown files in a single pass.")
+    parser.add_argument("directory", help="Path to the root directory to scan.")
+    parser.add_argument("-s", "--stage", action="append", choices=list(STAGES), help="Migration to apply, can be repeated (default: all).")
+    parser.add_argument("-j", "--jobs", type=int, help="Number of worker processes (default: number of CPUs).")
+    parser.add_argument("--dry-run", action="store_true", help="Print the planned changes without writing any file.")
+    parser.add_argument("--no-cache", action="store_true", help="Process all files, also the ones unchanged since the last run.")
+    args = parser.parse_args()
+
+    # the stages are always applied in the order they are registered, independent of the order of the arguments
+    stages = [stage for name, stage in STAGES.items() if not args.stage or name in args.stage]
+    run_migration(args.directory, stages, args.jobs, None if args.no_cache else CACHE_PATH, args.dry_run)
+
+if __name__ == "__main__":
+    main()
@@ -2,72 +2,60 @@ import os
 import re
 import argparse
 
+from docs_migration import STAGES, register_stage, run_migration
+
 LOG_DIR = 'changelog'
 LOG_FILENAME = 'command_changes.log'
 LOG_PATH = os.path.join(LOG_DIR, LOG_FILENAME)
+CACHE_FILENAME = 'command_changes.cache.json'
+CACHE_PATH = os.path.join(LOG_DIR, CACHE_FILENAME)
 
-def ensure_log_directory():
-    os.makedirs(LOG_DIR, exist_ok=True)
+COMMAND_PATTERN = re.compile(r'\{\{<\s*command\s*>\}\}([\s\S]*?)\{\{<\s*/\s*command\s*>\}\}', re.MULTILINE)
+PROMPT_PATTERN = re.compile(r'^\s*[$#]\s*')
 
 def normalize_command_block(command_text):
     lines = command_text.strip().splitlines()
     cleaned_lines = []
 
     for line in lines:
-        cleaned_line = re.sub(r'^\s*[$#]\s*', '', line)  # Remove leading $ or #
+        cleaned_line = PROMPT_PATTERN.sub('', line)  # Remove leading $ or #
         cleaned_lines.append(cleaned_line)
 
     return "```bash\n" + "\n".join(cleaned_lines) + "\n```"
 
-def process_file(filepath, log_entries):
-    with open(filepath, 'r', encoding='utf-8') as file:
-        content = file.read()
-
-    pattern = re.compile(r'\{\{<\s*command\s*>\}\}([\s\S]*?)\{\{<\s*/\s*command\s*>\}\}', re.MULTILINE)
-    matches = list(pattern.finditer(content))
-    if not matches:
-        return
+@register_stage('commands', LOG_PATH)
+def rewrite_commands(filepath, content, log_entries):
+    line_number = 1
+    line_position = 0
 
-    new_content = content
-    for match in matches:
+    def rewrite(match):
+        nonlocal line_number, line_position
         original_block = match.group(0)
-        command_text = match.group(1)
-        converted_block = normalize_command_block(command_text)
-
-        # Determine line number of the start of the match
-        line_number = content[:match.start()].count('\n') + 1
+        converted_block = normalize_command_block(match.group(1))
 
-        new_content = new_content.replace(original_block, converted_block, 1)
+        # Determine line number of the start of the match, counting only the line breaks since the previous match
+        line_number += content.count('\n', line_position, match.start())
+        line_position = match.start()
 
         log_entry = f"{filepath}:{line_number}: {original_block.strip()} -> {converted_block.strip()}"
         log_entries.append(log_entry)
+        # the converted block replaces exactly this match, even if the same block occurs multiple times
+        return converted_block
 
-    with open(filepath, 'w', encoding='utf-8') as file:
-        file.write(new_content)
-
-def crawl_directory(directory):
-    ensure_log_directory()
-    log_entries = []
-
-    for root, _, files in os.walk(directory):
-        for filename in files:
-            if filename.endswith(('.md', '.mdx')):
-                filepath = os.path.join(root, filename)
-                process_file(filepath, log_entries)
-
-    # Write log file
-    with open(LOG_PATH, 'w', encoding='utf-8') as log_file:
-        for entry in log_entries:
-            log_file.write(entry + '\n')
+    return COMMAND_PATTERN.sub(rewrite, content)
 
-    print(f"Logged {len(log_entries)} change(s) to {LOG_PATH}")
+def crawl_directory(directory, jobs=None, dry_run=False, use_cache=True):
+    run_migration(directory, [STAGES['commands']], jobs, CACHE_PATH if use_cache else None, dry_run)
 
 def main():
     parser = argparse.ArgumentParser(description="Convert command blocks in Markdown files.")
     parser.add_argument("directory", help="Path to the root directory to scan.")
+    parser.add_argument("-j", "--jobs", type=int, help="Number of worker processes (default: number of CPUs).")
+    parser.add_argument("--dry-run", action="store_true", help="Print the planned changes without writing any file.")
+    parser.add_argument("--no-cache", action="store_true", help="Process all files, also the ones unchanged since the last run.")
     args = parser.parse_args()
 
-    crawl_directory(args.directory)
+    crawl_directory(args.directory, args.jobs, args.dry_run, not args.no_cache)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -2,96 +2,69 @@ import os
 import re
 import argparse
 
+from docs_migration import STAGES, register_stage, run_migration
+
 LOG_DIR = 'changelog'
 LOG_FILENAME = 'image_changes.log'
 LOG_PATH = os.path.join(LOG_DIR, LOG_FILENAME)
-
-def ensure_log_directory():
-    os.makedirs(LOG_DIR, exist_ok=True)
+CACHE_FILENAME = 'image_changes.cache.json'
+CACHE_PATH = os.path.join(LOG_DIR, CACHE_FILENAME)
+
+# MDX-wrapped <img ...> tags, raw <img ...> tags and Hugo-style figure tags, in one pattern so every file is
+# scanned once. Whitespace and attributes never match a line break, so a match never spans multiple lines.
+IMAGE_PATTERN = re.compile(
+    r"""(?P<mdx>\{[^\S\n]*/\*[^\S\n]*<img[^\S\n]+(?P<mdx_attrs>[^>\n]+?)[^\S\n]*/?>[^\S\n]*\*/\}"""
+    r"""[^\S\n]*\{[^\S\n]*/\*[^\S\n]*mdx-disabled[^\S\n]*\*/[^\S\n]*\})"""
+    r"""|(?P<img><img[^\S\n]+(?P<img_attrs>[^>\n]*?)[^\S\n]*/?>)"""
+    r"""|(?P<hugo>\{\{<[^\S\n]*figure[^\S\n]+[^>\n]*src="(?P<hugo_src>[^"\n]+)"[^>\n]*alt="(?P<hugo_alt>[^"\n]+)"[^>\n]*>\}\})""")
+SRC_PATTERN = re.compile(r'src\s*=\s*["\']([^"\']+)["\']')
+ALT_PATTERN = re.compile(r'alt\s*=\s*["\']([^"\']+)["\']')
 
 def extract_attributes(tag: str):
     """Extracts src and alt attributes from a tag string."""
-    src_match = re.search(r'src\s*=\s*["\']([^"\']+)["\']', tag)
-    alt_match = re.search(r'alt\s*=\s*["\']([^"\']+)["\']', tag)
+    src_match = SRC_PATTERN.search(tag)
+    alt_match = ALT_PATTERN.search(tag)
     if src_match and alt_match:
         return src_match.group(1), alt_match.group(1)
     return None, None
 
-def process_file(filepath, log_entries):
-    with open(filepath, 'r', encoding='utf-8') as file:
-        lines = file.readlines()
-
-    changed = False
-
-    for line_number, line in enumerate(lines, start=1):
-        new_line = line
-
-        # Match MDX-wrapped <img ...> tags
-        mdx_pattern = re.finditer(
-            r"""\{\s*/\*\s*<img\s+([^>]+?)\s*/?>\s*\*/\}\s*\{\s*/\*\s*mdx-disabled\s*\*/\s*\}""", new_line)
-        for match in mdx_pattern:
-            old = match.group(0)
-            attrs = match.group(1)
-            src, alt = extract_attributes(attrs)
-            if src and alt:
-                new = f'![{alt}](/images/aws/{src})'
-                new_line = new_line.replace(old, new)
-                log_entries.append(f"{filepath}:{line_number}: {old} -> {new}")
-                changed = True
-
-        # Match raw <img ...> tags
-        img_pattern = re.finditer(
-            r"""<img\s+([^>]*?)\s*/?>""", new_line)
-        for match in img_pattern:
-            old = match.group(0)
-            attrs = match.group(1)
-            src, alt = extract_attributes(attrs)
-            if src and alt:
-                new = f'![{alt}](/images/aws/{src})'
-                new_line = new_line.replace(old, new)
-                log_entries.append(f"{filepath}:{line_number}: {old} -> {new}")
-                changed = True
-
-        # Match Hugo-style figure tags
-        hugo_pattern = re.finditer(
-            r"""\{\{<\s*figure\s+[^>]*src="([^"]+)"[^>]*alt="([^"]+)"[^>]*>\}\}""", new_line)
-        for match in hugo_pattern:
-            old = match.group(0)
-            src = match.group(1)
-            alt = match.group(2)
-            new = f'![{alt}](/images/aws/{src})'
-            new_line = new_line.replace(old, new)
-            log_entries.append(f"{filepath}:{line_number}: {old} -> {new}")
-            changed = True
-
-        lines[line_number - 1] = new_line
+@register_stage('images', LOG_PATH)
+def rewrite_images(filepath, content, log_entries):
+    line_number = 1
+    line_position = 0
 
-    if changed:
-        with open(filepath, 'w', encoding='utf-8') as file:
-            file.writelines(lines)
+    def rewrite(match):
+        nonlocal line_number, line_position
+        # count the line breaks since the previous match only, instead of since the start of the file
+        line_number += content.count('\n', line_position, match.start())
+        line_position = match.start()
 
-def crawl_directory(directory):
-    ensure_log_directory()
-    log_entries = []
+        old = match.group(0)
+        if match.lastgroup == 'hugo':
+            src, alt = match.group('hugo_src'), match.group('hugo_alt')
+        else:
+            src, alt = extract_attributes(match.group(f'{match.lastgroup}_attrs'))
+        if not (src and alt):
+            return old
 
-    for root, _, files in os.walk(directory):
-        for filename in files:
-            if filename.endswith(('.md', '.mdx')):
-                filepath = os.path.join(root, filename)
-                process_file(filepath, log_entries)
+        new = f'![{alt}](/images/aws/{src})'
+        log_entries.append(f"{filepath}:{line_number}: {old} -> {new}")
+        return new
 
-    with open(LOG_PATH, 'w', encoding='utf-8') as log_file:
-        for entry in log_entries:
-            log_file.write(entry + '\n')
+    return IMAGE_PATTERN.sub(rewrite, content)
 
-    print(f"Logged {len(log_entries)} change(s) to {LOG_PATH}")
+def crawl_directory(directory, jobs=None, dry_run=False, use_cache=True):
+    run_migration(directory, [STAGES['images']], jobs, CACHE_PATH if use_cache else None, dry_run)
 
 def main():
     parser = argparse.ArgumentParser(description="Update image syntax in Markdown files.")
     parser.add_argument("directory", help="Path to the root directory to scan.")
+    parser.add_argument("-j", "--jobs", type=int, help="Number of worker processes (default: number of CPUs).")
+    parser.add_argument("--dry-run", action="store_true", help="Print the planned changes without writing any file.")
+    parser.add_argument("--no-cache", action="store_true", help="Process all files, also the ones unchanged since the last run.")
     args = parser.parse_args()
 
-    crawl_directory(args.directory)
+    crawl_directory(args.directory, args.jobs, args.dry_run, not args.no_cache)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,280 @@
+"""
+Benchmark for create_data_coverage.py with synthetic implementation details and raw metrics.
+
+The corpus is generated with a fixed seed, so the runs are reproducible. Every stage runs in a fresh process,
+which reports the wall time, the RSS before the timed section, and the peak RSS of the timed section. The input of
+create_data_templates_for_service is aggregated in the same process (without --jobs), so on Linux the peak RSS is reset
+before the timed section. On other platforms it cannot be reset, and the peak RSS of that stage includes the aggregation:
+    python3 -m scripts.benchmark_data_coverage --services 120 --operations 40 --files 12 --rows 50000
+"""
+import csv
+import json
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from scripts.create_data_coverage import (
+    aggregate_recorded_raw_data,
+    create_data_templates_for_service,
+    main,
+    read_implementation_details,
+)
+
+RAW_METRICS_HEADER = [
+    "service",
+    "operation",
+    "parameters",
+    "response_code",
+    "response_data",
+    "exception",
+    "origin",
+    "test_node_id",
+    "xfail",
+    "aws_validated",
+    "snapshot",
+    "snapshot_skipped_paths",
+]
+# prefixes of the raw-metrics files, they define the test suite of the recorded rows
+TEST_SOURCES = ["community-integration-test", "pro-integration-test", "terraform-test", "moto-integration-test"]
+PARAMETERS = ["", "QueueUrl", "QueueUrl,Attributes", "Name", "Name,Tags", "FunctionName,Payload"]
+EXCEPTIONS = ["", "", "", "ValidationException", "ResourceNotFoundException", "CommonServiceException"]
+
+
+def generate_corpus(
+    target_dir: str,
+    services: int = 20,
+    operations: int = 20,
+    files: int = 4,
+    rows: int = 10000,
+    parameterized: float = 0.3,
+    seed: int = 0,
+):
+    """
+    Generates the synthetic implementation details and raw metrics, in the layout create_data_coverage.py expects:
+    <target_dir>/implementation/{pro,community}/implementation_coverage_full.csv and <target_dir>/raw/*.csv
+    :param target_dir: the directory where the corpus will be stored
+    :param services: number of services
+    :param operations: number of operations per service
+    :param files: number of raw-metrics files, spread over the community, pro, terraform and moto test suites
+    :param rows: number of rows per raw-metrics file
+    :param parameterized: fraction of the rows recorded by parameterized tests (node-id ending with "[...]")
+    :param seed: seed of the random generator
+    """
+    rnd = random.Random(seed)
+    service_names = [f"service{i:03d}" for i in range(services)]
+    operation_names = [f"Operation{i:03d}" for i in range(operations)]
+
+    for edition in ["pro", "community"]:
+        impl_dir = Path(target_dir, "implementation", edition)
+        impl_dir.mkdir(parents=True, exist_ok=True)
+        with open(impl_dir.joinpath("implementation_coverage_full.csv"), "w", newline="") as fd:
+            writer = csv.writer(fd)
+            writer.writerow(["service", "operation", "is_implemented"])
+            for service in service_names:
+                for operation in operation_names:
+                    writer.writerow([service, operation, str(rnd.random() < 0.8)])
+
+    raw_dir = Path(target_dir, "raw")
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    for file_index in range(files):
+        test_source = TEST_SOURCES[file_index % len(TEST_SOURCES)]
+        with open(raw_dir.joinpath(f"{test_source}-{file_index}.csv"), "w", newline="") as fd:
+            writer = csv.writer(fd)
+            writer.writerow(RAW_METRICS_HEADER)
+            for _ in range(rows):
+                service = rnd.choice(service_names)
+                test_name = f"tests/aws/services/{service}/test_{service}.py::TestApi::test_{rnd.randrange(200)}"
+                if rnd.random() < parameterized:
+                    test_name += f"[param-{rnd.randrange(50)}]"
+                exception = rnd.choice(EXCEPTIONS)
+                response_data = json.dumps({"__type": "QueueDoesNotExist"}) if exception else ""
+                writer.writerow(
+                    [
+                        service,
+                        rnd.choice(operation_names),
+                        rnd.choice(PARAMETERS),
+                        rnd.choice(["200", "200", "200", "400", "404", "500"]),
+                        response_data,
+                        exception,
+                        rnd.choice(["internal", "external"]),
+                        # some records do not have a node-id (requests in the background between tests)
+                        test_name if rnd.random() < 0.95 else "",
+                        str(rnd.random() < 0.02),
+                        str(rnd.random() < 0.5),
+                        str(rnd.random() < 0.5),
+                        rnd.choice(["", "", "", "all", "$..ResponseMetadata"]),
+                    ]
+                )
+
+
+def _proc_status_mb(field: str) -> float | None:
+    """returns a memory field of /proc/self/status (e.g. "VmHWM", "VmRSS") in MB, or None if it is not available"""
+    try:
+        with open("/proc/self/status", "r") as fd:
+            for line in fd:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    """resets the peak RSS of the current process to its current RSS, only supported on Linux"""
+    try:
+        with open("/proc/self/clear_refs", "w") as fd:
+            fd.write("5")
+    except OSError:
+        pass
+
+
+def _current_rss_mb() -> float:
+    """returns the current RSS of the process in MB, or its peak RSS if the current one is not available"""
+    current_rss = _proc_status_mb("VmRSS")
+    return current_rss if current_rss is not None else _peak_rss_mb()
+
+
+def _peak_rss_mb() -> float:
+    """
+    returns the peak RSS of the current process (since the last _reset_peak_rss), or of its largest child process
+    (--jobs), in MB
+    """
+    own_peak = _proc_status_mb("VmHWM")
+    max_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if own_peak is None:
+        max_rss = max(max_rss, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    # ru_maxrss is reported in bytes on macOS, and in kilobytes on Linux
+    max_rss_mb = max_rss / 1024 / 1024 if sys.platform == "darwin" else max_rss / 1024
+    return max(max_rss_mb, own_peak or 0)
+
+
+def _run_stage(stage: str, corpus_dir: str, options: dict) -> dict:
+    """
+    runs a single stage of the coverage generator, executed in a fresh process
+    :param stage: "main", "aggregate_recorded_raw_data" or "create_data_templates_for_service"
+    :param corpus_dir: the directory of the generated corpus
+    :param options: the options passed to the coverage generator (jobs, engine, cache_dir, ...)
+    :returns: dict with the wall time in seconds, the RSS before the timed section, and the peak RSS in MB of the stage
+    """
+    impl_dir = str(Path(corpus_dir, "implementation"))
+    raw_dir = str(Path(corpus_dir, "raw"))
+    output_dir = tempfile.mkdtemp(prefix="coverage-benchmark-")
+    aggregate_options = {key: value for key, value in options.items() if key in ("jobs", "cache_dir", "engine")}
+    try:
+        if stage == "main":
+            rss_before = _current_rss_mb()
+            start = time.perf_counter()
+            main(impl_dir, raw_dir, output_dir, **options)
+            duration = time.perf_counter() - start
+        elif stage == "aggregate_recorded_raw_data":
+            impl_details = read_implementation_details(impl_dir)
+            rss_before = _current_rss_mb()
+            start = time.perf_counter()
+            aggregate_recorded_raw_data(raw_dir, impl_details, **aggregate_options)
+            duration = time.perf_counter() - start
+        elif stage == "create_data_templates_for_service":
+            # aggregated without --jobs: the peak RSS of child processes cannot be reset, it would be part of the stage
+            serial_options = {key: value for key, value in aggregate_options.items() if key != "jobs"}
+            recorded_metrics = aggregate_recorded_raw_data(
+                raw_dir, read_implementation_details(impl_dir), **serial_options
+            )
+            template_options = {key: value for key, value in options.items() if key in ("split_details", "minify")}
+            # the peak of the aggregation is not part of the stage, only the recorded metrics it keeps (rss_before)
+            _reset_peak_rss()
+            rss_before = _current_rss_mb()
+            start = time.perf_counter()
+            for service in sorted(recorded_metrics.keys()):
+                create_data_templates_for_service(
+                    output_dir + "/data", recorded_metrics[service], service, **template_options
+                )
+            duration = time.perf_counter() - start
+        else:
+            raise ValueError(f"unknown stage {stage}")
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return {
+        "stage": stage,
+        "seconds": round(duration, 3),
+        "rss_before_mb": round(rss_before, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def run_benchmark(corpus_dir: str, options: dict, repeat: int = 1) -> list[dict]:
+    """
+    runs all stages of the coverage generator on the corpus
+    :param corpus_dir: the directory of the generated corpus
+    :param options: the options passed to the coverage generator (jobs, engine, cache_dir, ...)
+    :param repeat: number of runs per stage, the fastest run is reported
+    :returns: list with the results of each stage
+    """
+    results = []
+    for stage in ["main", "aggregate_recorded_raw_data", "create_data_templates_for_service"]:
+        runs = []
+        for _ in range(repeat):
+            # a fresh process per run, so the peak RSS only covers this stage
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                runs.append(executor.submit(_run_stage, stage, corpus_dir, options).result())
+        results.append(min(runs, key=lambda run: run["seconds"]))
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    argParser = argparse.ArgumentParser(description="Benchmark create_data_coverage.py with a synthetic corpus")
+    argParser.add_argument("--services", type=int, default=20, help="number of services (default: 20)")
+    argParser.add_argument("--operations", type=int, default=20, help="number of operations per service (default: 20)")
+    argParser.add_argument("--files", type=int, default=4, help="number of raw-metrics files (default: 4)")
+    argParser.add_argument("--rows", type=int, default=10000, help="number of rows per raw-metrics file (default: 10000)")
+    argParser.add_argument("--parameterized", type=float, default=0.3, help="fraction of rows from parameterized tests (default: 0.3)")
+    argParser.add_argument("--seed", type=int, default=0, help="seed of the synthetic corpus (default: 0)")
+    argParser.add_argument("--repeat", type=int, default=1, help="number of runs per stage, the fastest is reported (default: 1)")
+    argParser.add_argument("--corpus-dir", help="directory for the corpus, it is kept after the run (default: temporary directory)")
+    argParser.add_argument("-j", "--jobs", type=int, default=1, help="passed to the coverage generator")
+    argParser.add_argument("-e", "--engine", choices=["rows", "columnar"], default="rows", help="passed to the coverage generator")
+    argParser.add_argument("-c", "--cache-dir", help="passed to the coverage generator")
+    argParser.add_argument("--split-details", action="store_true", help="passed to the coverage generator")
+    argParser.add_argument("--max-details", type=int, help="passed to the coverage generator (only the main stage)")
+    argParser.add_argument("-o", "--output", help="path of a json-file to store the results")
+
+    args = argParser.parse_args()
+
+    corpus_dir = args.corpus_dir or tempfile.mkdtemp(prefix="coverage-corpus-")
+    corpus = {
+        "services": args.services,
+        "operations": args.operations,
+        "files": args.files,
+        "rows": args.rows,
+        "parameterized": args.parameterized,
+        "seed": args.seed,
+    }
+    options = {
+        "jobs": args.jobs,
+        "engine": args.engine,
+        "cache_dir": args.cache_dir,
+        "split_details": args.split_details,
+        "max_details": args.max_details,
+    }
+    try:
+        print(f"generating corpus in {corpus_dir}: {corpus}")
+        generate_corpus(corpus_dir, **corpus)
+        results = run_benchmark(corpus_dir, options, repeat=args.repeat)
+    finally:
+        if not args.corpus_dir:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    print(f"{'stage':<36}{'seconds':>10}{'RSS before (MB)':>18}{'peak RSS (MB)':>16}")
+    for result in results:
+        print(
+            f"{result['stage']:<36}{result['seconds']:>10.3f}{result['rss_before_mb']:>18.1f}{result['peak_rss_mb']:>16.1f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as fd:
+            json.dump({"corpus": corpus, "options": options, "results": results}, fd, indent=2)
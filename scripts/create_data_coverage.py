@@ -2,17 +2,251 @@
 Script to generate coverage md-files for services, and related data-templates
 """
 import csv
+import hashlib
 import os
+import pickle
 import sys
 from pathlib import Path
 import json
 from json import JSONDecodeError
 from pathlib import Path
 import shutil
-from operator import itemgetter
+import tempfile
+from array import array
+from bisect import insort
+from collections import Counter, namedtuple
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache, partial
+from heapq import merge
+from itertools import compress, groupby, islice
+from operator import and_, attrgetter, itemgetter, not_
+from time import perf_counter
+
+# version of the manifest used for incremental runs, needs to be increased if the generated data-templates change
+MANIFEST_VERSION = 1
+# version of the columnar cache of the raw metrics, needs to be increased if the format of the cache changes
+COLUMNAR_CACHE_VERSION = 2
+# columns of the raw metrics stored in the columnar cache, "node_id" is resolved from "node_id" or "test_node_id"
+CACHED_STRING_COLUMNS = (
+    "service",
+    "operation",
+    "node_id",
+    "parameters",
+    "exception",
+    "snapshot_skipped_paths",
+    "origin",
+)
+CACHED_BOOLEAN_COLUMNS = ("xfail", "aws_validated", "snapshot")
+# number of spilled test details which are pickled together, see _DetailSpill
+SPILL_CHUNK_SIZE = 10000
+# the exception types of responses up to this size are cached, so the cache keeps at most 4096 small responses alive
+MEMOIZED_RESPONSE_SIZE = 1024
+
+
+class _Profile:
+    """
+    collects the timings of the stages and counters of a run, enabled with --profile.
+    The timings of the stages are exclusive, e.g. "filter_rows" does not contain the time to read the rows.
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self.counters = {}
+
+    def start(self, exclude: tuple[str, ...] = ()) -> tuple:
+        """
+        starts to measure the time of a stage
+        :param exclude: stages which are measured separately while this stage is running
+        :returns: the marker to pass to stop
+        """
+        return perf_counter(), {name: self.timings.get(name, 0.0) for name in exclude}
+
+    def stop(self, stage: str, mark: tuple):
+        """
+        adds the time since the marker was created to the stage
+        :param stage: name of the stage
+        :param mark: the marker returned by start
+        """
+        start, excluded = mark
+        elapsed = perf_counter() - start
+        for name, before in excluded.items():
+            elapsed -= self.timings.get(name, 0.0) - before
+        self.timings[stage] = self.timings.get(stage, 0.0) + elapsed
+
+    @contextmanager
+    def stage(self, stage: str, exclude: tuple[str, ...] = ()):
+        mark = self.start(exclude)
+        try:
+            yield
+        finally:
+            self.stop(stage, mark)
+
+    def count(self, counter: str, value: int = 1):
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def timed_rows(self, rows: Iterator, stage: str) -> Iterator:
+        """
+        iterates over the rows, and adds the time spent reading them to the stage
+        :param rows: the rows, e.g. a csv.reader
+        :param stage: name of the stage
+        """
+        while True:
+            mark = self.start()
+            row = next(rows, None)
+            self.stop(stage, mark)
+            if row is None:
+                return
+            self.count("rows_read")
+            yield row
+
+    def merge(self, other: "_Profile"):
+        """adds the timings and counters of another profile, e.g. of a worker process"""
+        for stage, seconds in other.timings.items():
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+        for counter, value in other.counters.items():
+            self.count(counter, value)
+
+
+# the profile of the current run, only set with --profile
+_profile: _Profile | None = None
+
+
+def _profile_stage(stage: str, exclude: tuple[str, ...] = ()):
+    """returns a context manager which measures the time of the stage, if the run is profiled"""
+    return _profile.stage(stage, exclude) if _profile else nullcontext()
+
+
+class _DetailSpill:
+    """
+    keeps the number of test details in memory below a limit, enabled with --max-details.
+    If the limit is exceeded, the collected test details of every service are moved to a run on disk, sorted the same
+    way as they are written. The runs of a service are merged with the details still in memory when its
+    data-template is written, so the details are never loaded all at once.
+    """
+
+    def __init__(self, max_details: int, spill_dir: str):
+        """
+        :param max_details: maximum number of test details in memory
+        :param spill_dir: directory where the runs are stored
+        """
+        self.max_details = max_details
+        self.spill_dir = Path(spill_dir)
+        # test details currently in memory
+        self.details = 0
+        # the collected metrics per service which are spilled, see _aggregate_raw_metrics_files
+        self.recorded_data = None
+        # paths of the runs per service, in the order they were spilled
+        self.runs = {}
+
+    def check(self):
+        """
+        spills the test details if the limit is exceeded. Must only be called while no references to the nested
+        dicts of the details are held, as they are replaced.
+        """
+        if self.details > self.max_details and self.recorded_data is not None:
+            with _profile_stage("spill"):
+                self.spill()
+
+    def spill(self):
+        """moves the test details of all services to a new run on disk"""
+        for service, metrics in self.recorded_data.items():
+            details = metrics.pop("details", None)
+            if not details:
+                continue
+            service_runs = self.runs.setdefault(service, [])
+            run = self.spill_dir.joinpath(f"{service}-{len(service_runs)}.pickle")
+            with open(run, "wb") as fd:
+                records = _iter_detail_records(details)
+                while chunk := list(islice(records, SPILL_CHUNK_SIZE)):
+                    pickle.dump(chunk, fd, protocol=pickle.HIGHEST_PROTOCOL)
+                    if _profile:
+                        _profile.count("details_spilled", len(chunk))
+            service_runs.append(run)
+        self.details = 0
+
+    def sorted_details(self, service: str, details: dict) -> Iterator[tuple[str, Iterator]]:
+        """
+        returns the test details of a service in order, like _sorted_operation_details for each operation
+        :param service: name of the service
+        :param details: the test details of the service which are still in memory
+        :returns: (key, value) pairs of the operations, with the (key, value) pairs of the parameters as values
+        """
+        # the runs are merged in the order they were spilled, followed by the details still in memory which were
+        # collected last. The merge is stable, so the details keep the order they were collected in.
+        records = merge(
+            *(_read_spilled_run(run) for run in self.runs.pop(service, [])),
+            _iter_detail_records(details),
+            key=_spilled_detail_order,
+        )
+        for op_name, op_records in groupby(records, key=itemgetter(0)):
+            yield op_name, (
+                (param, ((test_suite, _unique_details(suite_records)) for test_suite, suite_records in groupby(param_records, key=itemgetter(2))))
+                for param, param_records in groupby(op_records, key=itemgetter(1))
+            )
+
+
+def _iter_detail_records(details: dict) -> Iterator[tuple]:
+    """
+    returns the test details of a service as flat (operation, parameters, test-suite, test detail) records, in the
+    order they are written
+    :param details: the test details of the service, grouped by operation, parameters, and test-suite
+    """
+    for op_name in sorted(details.keys()):
+        params = details[op_name]
+        for param in sorted(params.keys()):
+            test_suites = params[param]
+            for test_suite in sorted(test_suites.keys()):
+                for test_detail in test_suites[test_suite]:
+                    yield op_name, param, test_suite, test_detail
+
+
+def _spilled_detail_order(record: tuple) -> tuple:
+    """order of the flat records of the test details, see _iter_detail_records"""
+    op_name, param, test_suite, test_detail = record
+    return op_name, param, test_suite, test_detail.response, test_detail.node_id
+
+
+def _read_spilled_run(run: Path) -> Iterator[tuple]:
+    """
+    reads the flat records of the test details from a run, chunk by chunk
+    :param run: path of the run, see _DetailSpill.spill
+    """
+    with open(run, "rb") as fd:
+        while True:
+            try:
+                chunk = pickle.load(fd)
+            except EOFError:
+                return
+            yield from chunk
+
+
+def _unique_details(records: Iterator[tuple]) -> list[dict]:
+    """
+    returns the test details of the flat records of a single test-suite without duplicates, the first one is kept
+    :param records: the flat records, see _iter_detail_records
+    """
+    unique = set()
+    test_details = []
+    for _, _, _, test_detail in records:
+        if test_detail not in unique:
+            unique.add(test_detail)
+            test_details.append(test_detail._asdict())
+    return test_details
+
+
+# the spill of the test details of the current run, only set with --max-details
+_detail_spill: _DetailSpill | None = None
+
 
 def create_data_templates_for_service(
-    target_dir: str, metrics: dict, service: str, delete_if_exists: bool = False
+    target_dir: str,
+    metrics: dict,
+    service: str,
+    delete_if_exists: bool = False,
+    split_details: bool = False,
+    minify: bool = False,
 ):
     """
     Creates the data-template for a service.
@@ -20,8 +254,10 @@ def create_data_templates_for_service(
     :param metrics: the collected metrics for the service
     :param service: name of the service
     :param delete_if_exists: checks if the target_dir exists and deletes it before creating new md-files. default: False
+    :param split_details: if True, the data-template <service>.json only contains the operations, and the test details
+        of each operation are stored in a separate file details/<service>/<operation>.json. default: False
+    :param minify: if True, the json-files are written without indentation and whitespace. default: False
     """
-    output = {}
     details = metrics.pop("details", {})
     operations = []
 
@@ -36,7 +272,7 @@ def create_data_templates_for_service(
         if not pro_support and value.get("availability") == "pro":
             pro_support = True
 
-    output["service"] = service
+    output = {"service": service}
     if pro_support:
         output["pro_support"] = True
     if community_support:
@@ -44,21 +280,13 @@ def create_data_templates_for_service(
 
     output["operations"] = operations
 
-    # sort the details
-    for op_details, params in details.items():
-        # alphabetically by parameters
-        details[op_details] = dict(sorted(params.items()))
-        for param, test_suites in details[op_details].items():
-            # alphabetically by test-suite (ls-community/ls-pro)
-            details[op_details][param] = dict(sorted(test_suites.items()))
-            for test_suite, test_list in details[op_details][param].items():
-                # by test details e.g. first response code then node_id
-                details[op_details][param][test_suite] = sorted(
-                    test_list, key=itemgetter("response", "node_id")
-                )
-
-    # sort alphabetically by operation-name
-    output["details"] = dict(sorted(details.items()))
+    def _sorted_details():
+        if _detail_spill and service in _detail_spill.runs:
+            yield from _detail_spill.sorted_details(service, details)
+            return
+        # alphabetically by operation-name, the details of an operation are released once written
+        for op_name in sorted(details.keys()):
+            yield op_name, _sorted_operation_details(details.pop(op_name))
 
     # write data-template file
     dirpath = Path(target_dir)
@@ -68,25 +296,101 @@ def create_data_templates_for_service(
 
     dirpath.mkdir(parents=True, exist_ok=True)
 
-    file_name = dirpath.joinpath(f"{service}.json")
-    with open(file_name, "w") as fd:
-        json.dump(output, fd, indent=2)
+    details_dir = dirpath.joinpath("details", service)
+    if not split_details:
+        output["details"] = _sorted_details()
+        _write_json_file(dirpath.joinpath(f"{service}.json"), output, minify)
+        # the details of a previous run with split_details are part of the data-template now
+        shutil.rmtree(details_dir, ignore_errors=True)
+        if details_dir.parent.is_dir() and not any(details_dir.parent.iterdir()):
+            details_dir.parent.rmdir()
+        return
 
+    _write_json_file(dirpath.joinpath(f"{service}.json"), output, minify)
+    # one file per operation, so the details can be loaded on demand
+    if details_dir.exists():
+        # remove details of operations which are not tested anymore
+        shutil.rmtree(details_dir)
+    details_dir.mkdir(parents=True)
+    for op_name, params in _sorted_details():
+        _write_json_file(details_dir.joinpath(f"{op_name}.json"), params, minify)
 
-def main(
-    path_to_implementation_details: str,
-    path_to_raw_metrics: str,
-    target_dir: str,
-    service_lookup_details: str = None,
-):
+
+def _sorted_operation_details(params: dict) -> Iterator[tuple[str, Iterator]]:
+    """
+    returns the test details of an operation in order, without copying them: alphabetically by parameters, then
+    alphabetically by test-suite (ls-community/ls-pro). The test lists are already sorted when they are collected,
+    only the test details of the list which is written are converted to dicts.
+    :param params: the test details of the operation, grouped by parameters and test-suite
+    :returns: (key, value) pairs of the parameters, with (key, value) pairs of the test-suites as values
+    """
+    for param in sorted(params.keys()):
+        test_suites = params[param]
+        yield param, (
+            (test_suite, [test_detail._asdict() for test_detail in test_suites[test_suite]])
+            for test_suite in sorted(test_suites.keys())
+        )
+
+
+def _write_json_file(file_name: Path, data: dict | Iterator, minify: bool = False):
+    """
+    writes the data as json-file, the same as json.dump with indent=2 (or without whitespace if minified).
+    Values which are iterators of (key, value) pairs are written as objects while they are iterated, so they do
+    not need to be kept in memory. The data is written to a temporary file first, which then replaces the file, so
+    the file is never left half-written.
+    :param file_name: path of the json-file
+    :param data: the data to write, a dict or an iterator of (key, value) pairs
+    :param minify: write the json without indentation and whitespace
+    """
+    tmp_file_name = file_name.with_name(f"{file_name.name}.tmp")
+    try:
+        with open(tmp_file_name, "w") as fd, _profile_stage("write_json"):
+            _write_json_object(fd, data if isinstance(data, Iterator) else iter(data.items()), 0, minify)
+        os.replace(tmp_file_name, file_name)
+    except BaseException:
+        tmp_file_name.unlink(missing_ok=True)
+        raise
+
+
+def _write_json_object(fd, items: Iterator[tuple[str, object]], level: int, minify: bool):
+    """
+    writes a json object from (key, value) pairs, see _write_json_file
+    :param fd: the file to write to
+    :param items: the (key, value) pairs of the object
+    :param level: the level of indentation of the object
+    :param minify: write the json without indentation and whitespace
+    """
+    key_separator = ":" if minify else ": "
+    newline = "" if minify else "\n" + "  " * (level + 1)
+    fd.write("{")
+    empty = True
+    for key, value in items:
+        fd.write(("" if empty else ",") + newline + json.dumps(key) + key_separator)
+        empty = False
+        if isinstance(value, Iterator):
+            _write_json_object(fd, value, level + 1, minify)
+        elif minify:
+            fd.write(json.dumps(value, separators=(",", ":")))
+        else:
+            # the nested lines need to be indented to the level of the value
+            fd.write(json.dumps(value, indent=2).replace("\n", "\n" + "  " * (level + 1)))
+    if not empty and not minify:
+        fd.write("\n" + "  " * level)
+    fd.write("}")
+
+
+def read_implementation_details(path_to_implementation_details: str) -> dict:
+    """
+    reads the implementation-details for pro + community and generates a dict
+    with information about all services and operation, and indicator if those are implemented, and available only in pro:
+    {"service_name":
+      {
+          "operation_name": {"implemented": True, "pro": False}
+      }
+    }
+    :param path_to_implementation_details: directory of the {pro,community}/implementation_coverage_full.csv files
+    """
     impl_details = {}
-    # read the implementation-details for pro + community first and generate a dict
-    # with information about all services and operation, and indicator if those are implemented, and available only in pro:
-    # {"service_name":
-    #   {
-    #       "operation_name": {"implemented": True, "pro": False}
-    #   }
-    # }
     with open(
         f"{path_to_implementation_details}/pro/implementation_coverage_full.csv",
         mode="r",
@@ -120,30 +424,318 @@ def main(
             if row["is_implemented"] == "True":
                 service.setdefault(row["operation"], {"implemented": True})
                 service[row["operation"]]["pro"] = False
+    return impl_details
+
+
+def main(
+    path_to_implementation_details: str,
+    path_to_raw_metrics: str,
+    target_dir: str,
+    service_lookup_details: str = None,
+    jobs: int = 1,
+    manifest_file: str = None,
+    cache_dir: str = None,
+    engine: str = "rows",
+    split_details: bool = False,
+    minify: bool = False,
+    profile_file: str = None,
+    max_details: int = None,
+):
+    global _profile, _detail_spill
+    _profile = _Profile() if profile_file else None
+    run_start = perf_counter()
 
+    impl_details = read_implementation_details(path_to_implementation_details)
     services = sorted(impl_details.keys())
 
+    # with a limit of the test details in memory, the spilled runs are stored in a temporary directory
+    spill_dir = tempfile.TemporaryDirectory(prefix="coverage-details-") if max_details else None
+    _detail_spill = _DetailSpill(max_details, spill_dir.name) if spill_dir else None
+
+    try:
+        if manifest_file:
+            # only regenerate the services whose input files changed since the last run
+            _create_changed_data_templates(
+                path_to_implementation_details=path_to_implementation_details,
+                path_to_raw_metrics=path_to_raw_metrics,
+                target_dir=target_dir,
+                impl_details=impl_details,
+                manifest_file=manifest_file,
+                jobs=jobs,
+                cache_dir=cache_dir,
+                engine=engine,
+                split_details=split_details,
+                minify=minify,
+            )
+        else:
+            # read all recorded test data once and map the information to the services
+            recorded_metrics = aggregate_recorded_raw_data(
+                base_dir=path_to_raw_metrics,
+                impl_details=impl_details,
+                jobs=jobs,
+                cache_dir=cache_dir,
+                engine=engine,
+            )
+
+            for service in services:
+                create_data_templates_for_service(
+                    target_dir + "/data",
+                    recorded_metrics[service],
+                    service,
+                    split_details=split_details,
+                    minify=minify,
+                )
+    finally:
+        if spill_dir:
+            _detail_spill = None
+            spill_dir.cleanup()
+
+    if _profile:
+        # with multiple jobs, the timings of the stages are summed up over all worker processes
+        report = {
+            "total_seconds": round(perf_counter() - run_start, 3),
+            "jobs": jobs,
+            "engine": engine,
+            "timings": {stage: round(seconds, 3) for stage, seconds in sorted(_profile.timings.items())},
+            "counters": dict(sorted(_profile.counters.items())),
+        }
+        with open(profile_file, "w") as fd:
+            json.dump(report, fd, indent=2)
+        print(f"profile written to {profile_file}")
+
+
+def _create_changed_data_templates(
+    path_to_implementation_details: str,
+    path_to_raw_metrics: str,
+    target_dir: str,
+    impl_details: dict,
+    manifest_file: str,
+    jobs: int = 1,
+    cache_dir: str = None,
+    engine: str = "rows",
+    split_details: bool = False,
+    minify: bool = False,
+):
+    """
+    Creates the data-templates only for the services whose input changed since the run that wrote the manifest.
+    The manifest stores a fingerprint of every input csv-file, the services each raw-metrics file recorded, and a
+    fingerprint of the implementation details of each service, and the output options of the run:
+    {
+        "version": 1,
+        "options": {"split_details": false, "minify": false},
+        "implementation_details": {"pro/implementation_coverage_full.csv": {"sha256": "...", "mtime_ns": 0, "size": 0}},
+        "raw_metrics": {"community-integration-test.csv": {"sha256": "...", ..., "services": ["sqs", "sqs-query"]}},
+        "services": {"sqs": "<sha256 of the implementation details of sqs>"}
+    }
+    A service is regenerated if its implementation details changed, its data-template (or with split_details, its
+    details directory) is missing, or a raw-metrics file which recorded it was added, changed, or removed.
+    All services are regenerated if the output options differ from the ones in the manifest.
+    Only the raw-metrics files which recorded a regenerated service are parsed.
+    :param path_to_implementation_details: directory of the implementation_coverage_full.csv files
+    :param path_to_raw_metrics: directory where the raw-metrics csv-files are stored
+    :param target_dir: the directory where the data-templates are stored
+    :param impl_details: dict with the implementation details of all services and their operations
+    :param manifest_file: path of the manifest, it is created if it does not exist yet
+    :param jobs: number of processes used to parse the csv-files
+    :param cache_dir: directory of the columnar cache of the raw metrics, optional
+    :param engine: aggregation engine, "rows" or "columnar"
+    :param split_details: store the test details of each operation in a separate file
+    :param minify: write the json-files without indentation and whitespace
+    """
+    manifest_path = Path(manifest_file)
+    previous = {}
+    if manifest_path.exists():
+        with open(manifest_path, "r") as fd:
+            previous = json.load(fd)
+    options = {"split_details": split_details, "minify": minify}
+    # data-templates written with other options are outdated, like the ones of another version
+    if previous.get("version") != MANIFEST_VERSION or previous.get("options") != options:
+        previous = {}
+    previous_files = previous.get("raw_metrics", {})
+    previous_services = previous.get("services", {})
+
+    services = sorted(impl_details.keys())
+    routing = _route_services(services)
+    data_dir = Path(target_dir + "/data")
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "options": options,
+        "implementation_details": {},
+        "raw_metrics": {},
+        "services": {},
+    }
+    impl_base_dir = Path(path_to_implementation_details)
+    for path in sorted(impl_base_dir.glob("*/implementation_coverage_full.csv")):
+        key = path.relative_to(impl_base_dir).as_posix()
+        manifest["implementation_details"][key] = _fingerprint_file(
+            path, previous.get("implementation_details", {}).get(key)
+        )
+
+    changed_services = set()
+    for service in services:
+        fingerprint = hashlib.sha256(
+            json.dumps(impl_details[service], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        manifest["services"][service] = fingerprint
+        if (
+            previous_services.get(service) != fingerprint
+            or not data_dir.joinpath(f"{service}.json").exists()
+            or (split_details and not data_dir.joinpath("details", service).is_dir())
+        ):
+            changed_services.add(service)
+
+    def _recorded_in(recorded_services: list[str]) -> set[str]:
+        return {
+            target
+            for recorded_service in recorded_services
+            for target in routing.get(recorded_service, [])
+        }
+
+    base_dir = Path(path_to_raw_metrics)
+    pathlist = list(base_dir.rglob("*.csv"))
+    for path in pathlist:
+        key = path.relative_to(base_dir).as_posix()
+        previous_file = previous_files.get(key)
+        fingerprint = _fingerprint_file(path, previous_file)
+        if previous_file and previous_file["sha256"] == fingerprint["sha256"]:
+            fingerprint["services"] = previous_file["services"]
+        else:
+            # new or changed file: the services it recorded before, and the ones it records now need an update
+            fingerprint["services"] = _scan_recorded_services(path)
+            changed_services |= _recorded_in(fingerprint["services"])
+            if previous_file:
+                changed_services |= _recorded_in(previous_file["services"])
+        manifest["raw_metrics"][key] = fingerprint
+
+    for key in previous_files.keys() - manifest["raw_metrics"].keys():
+        # removed file
+        changed_services |= _recorded_in(previous_files[key]["services"])
+
+    if changed_services:
+        print(f"regenerating {len(changed_services)} of {len(services)} services: {', '.join(sorted(changed_services))}")
+        # only parse the files which recorded any of the changed services, and only map the rows of those services
+        changed_routing = {}
+        for recorded_service, targets in routing.items():
+            if changed_targets := [target for target in targets if target in changed_services]:
+                changed_routing[recorded_service] = changed_targets
+        relevant_paths = [
+            path
+            for path in pathlist
+            if _recorded_in(manifest["raw_metrics"][path.relative_to(base_dir).as_posix()]["services"])
+            & changed_services
+        ]
+        recorded_metrics = _aggregate_raw_metrics_files(
+            relevant_paths, impl_details, changed_routing, jobs, cache_dir, engine
+        )
+        for service in sorted(changed_services):
+            create_data_templates_for_service(
+                target_dir + "/data",
+                recorded_metrics[service],
+                service,
+                split_details=split_details,
+                minify=minify,
+            )
+    else:
+        print("no changes in the input files, nothing to regenerate")
+
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(manifest_path, "w") as fd:
+        json.dump(manifest, fd, indent=2)
+
+
+def _fingerprint_file(path: Path, previous: dict = None) -> dict:
+    """
+    creates the fingerprint of a file with the content hash, modification time and size.
+    If the modification time and size did not change, the content hash of the previous fingerprint is reused.
+    :param path: path to the file
+    :param previous: the fingerprint of the file from the last run, optional
+    """
+    stat = path.stat()
+    if previous and previous.get("mtime_ns") == stat.st_mtime_ns and previous.get("size") == stat.st_size:
+        sha256 = previous["sha256"]
+    else:
+        file_hash = hashlib.sha256()
+        with open(path, "rb") as fd:
+            while chunk := fd.read(1024 * 1024):
+                file_hash.update(chunk)
+        sha256 = file_hash.hexdigest()
+    return {"sha256": sha256, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def _scan_recorded_services(path: Path) -> list[str]:
+    """
+    returns the names of all services recorded in a raw-metrics csv-file
+    :param path: path to the csv-file
+    """
+    with open(path, "r") as csv_obj:
+        csv_reader = csv.reader(csv_obj)
+        service_col = _column_index(next(csv_reader, []), "service")
+        if service_col is None:
+            return []
+        return sorted({row[service_col] for row in csv_reader if len(row) > service_col} - {""})
+
+
+def _route_services(services: list[str]) -> dict[str, list[str]]:
+    """
+    creates the lookup from the service name as recorded in the raw metrics, to the services whose coverage it
+    contributes to, e.g. {"rds": ["docdb", "neptune", "rds"], "sqs-query": ["sqs"], ...}
+    :param services: the services for which the coverage is generated
+    """
+    routing = {}
     for service in services:
         # special handling for rds/neptune/docdb: the services "neptune" + "docdb" are recognized as "rds" calls
         check_service = service
         if service in ["neptune", "docdb"]:
             check_service = "rds"
+        routing.setdefault(check_service, []).append(service)
 
-        services_of_interest = [check_service]
         if service == "sqs":
             # also collect all metrics for "sqs-query" and add to the service
-            services_of_interest.append("sqs-query")
-        
-        # now check the actual recorded test data and map the information
-        recorded_metrics = aggregate_recorded_raw_data(
-            base_dir=path_to_raw_metrics,
-            operations=impl_details.get(service),
-            services_of_interest=services_of_interest,
-        )
+            routing.setdefault("sqs-query", []).append(service)
+    return routing
 
-        create_data_templates_for_service(
-            target_dir + "/data", recorded_metrics, service
-        )
+
+# a test detail as it is collected, the fields are written in this order. Equal test details are duplicates.
+_TestDetail = namedtuple(
+    "_TestDetail",
+    ["node_id", "test", "response", "error", "snapshot_skipped", "aws_validated", "snapshot_tested", "origin"],
+)
+# order of the test details: first response code then node_id
+_TEST_DETAIL_ORDER = attrgetter("response", "node_id")
+
+
+class _TestList(list):
+    """
+    list of test details without duplicates, sorted by response code and node-id.
+    The test details are also stored in a set, so checking for duplicates does not need to compare the new detail
+    with every detail in the list.
+    A new test detail is inserted after all details with the same response code and node-id, which results in the
+    same order as sorting the list (stable) after all details were added.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.keys = set()
+
+    def add(self, test_detail: _TestDetail):
+        """
+        inserts the test detail in order, unless the same detail is already in the list
+        :param test_detail: the test detail
+        """
+        if test_detail in self.keys:
+            if _profile:
+                _profile.count("details_deduplicated")
+            return
+        self.keys.add(test_detail)
+        if _detail_spill:
+            _detail_spill.details += 1
+        if _profile:
+            _profile.count("details_recorded")
+            with _profile.stage("sort_details"):
+                insort(self, test_detail, key=_TEST_DETAIL_ORDER)
+        else:
+            insort(self, test_detail, key=_TEST_DETAIL_ORDER)
 
 
 def _init_metric_recorder(operations_dict: dict):
@@ -174,11 +766,16 @@ def _init_metric_recorder(operations_dict: dict):
 
 
 def aggregate_recorded_raw_data(
-    base_dir: str, operations: dict, services_of_interest: list[str]
+    base_dir: str,
+    impl_details: dict,
+    jobs: int = 1,
+    cache_dir: str = None,
+    engine: str = "rows",
 ):
     """
-    collects all the raw metric data and maps them in a dict with information about the service, and a "details"
-    that includes details about any related test.
+    collects all the raw metric data in a single pass over the csv-files, and maps them for every service in a dict
+    with information about the service, and a "details" that includes details about any related test.
+    {"service-name":
             {"operation-name":
                 {
                 "implemented": true,
@@ -211,155 +808,818 @@ def aggregate_recorded_raw_data(
                     }
                 }
             }
+    }
     :param base_dir: directory where the raw-metrics csv-files are stored
-    :param operations: dict
-    :param service: service of interest
-    :returns: dict with details about invoked operations
+    :param impl_details: dict with the implementation details of all services and their operations
+    :param jobs: number of processes used to parse the csv-files. default: 1 (no parallelization)
+    :param cache_dir: directory of the columnar cache of the raw metrics. If set, the csv-files are only parsed if
+        they are not cached yet, or changed since they were cached. default: None (always parse the csv-files)
+    :param engine: "rows" evaluates every row of the raw metrics, "columnar" computes the operation flags as grouped
+        reductions over the columns of the columnar tables. Both engines collect the same data. default: "rows"
+    :returns: dict with details about invoked operations per service
+    """
+    routing = _route_services(sorted(impl_details.keys()))
+    # the order of the files determines the order of the collected details, it must be the same for every run mode
+    pathlist = list(Path(base_dir).rglob("*.csv"))
+    return _aggregate_raw_metrics_files(pathlist, impl_details, routing, jobs, cache_dir, engine)
+
+
+def _aggregate_raw_metrics_files(
+    pathlist: list[Path],
+    impl_details: dict,
+    routing: dict[str, list[str]],
+    jobs: int = 1,
+    cache_dir: str = None,
+    engine: str = "rows",
+) -> dict:
+    """
+    collects the raw metric data of the given csv-files, for all services that are part of the routing
+    :param pathlist: the csv-files, in the order they are read
+    :param impl_details: dict with the implementation details of all services and their operations
+    :param routing: lookup of the recorded service name to the services it contributes to
+    :param jobs: number of processes used to parse the csv-files
+    :param cache_dir: directory of the columnar cache of the raw metrics, optional
+    :param engine: aggregation engine, "rows" or "columnar"
+    :returns: dict with details about invoked operations per service
     """
     # contains internal + external calls
-    recorded_data = _init_metric_recorder(operations)
-    pathlist = Path(base_dir).rglob("*.csv")
-    for path in pathlist:
-        test_source = path.stem
-        # print(f"checking {str(path)}")
-        with open(path, "r") as csv_obj:
-            csv_dict_reader = csv.DictReader(csv_obj)
-            for metric in csv_dict_reader:
-                service = metric.get("service")
-                if service not in services_of_interest:
+    recorded_data = _init_service_recorders(impl_details, routing)
+    if _detail_spill:
+        _detail_spill.recorded_data = recorded_data
+
+    if jobs > 1 and len(pathlist) > 1:
+        # every file is parsed independently, the partial results are merged in the order of the pathlist
+        # which results in the same data as parsing all files sequentially
+        aggregate_file = partial(
+            _aggregate_raw_metrics_file,
+            impl_details=impl_details,
+            routing=routing,
+            cache_dir=cache_dir,
+            engine=engine,
+            profile=_profile is not None,
+        )
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for file_data, file_profile in executor.map(aggregate_file, pathlist):
+                with _profile_stage("merge", exclude=("sort_details", "spill")):
+                    _merge_recorded_data(recorded_data, file_data)
+                if file_profile:
+                    _profile.merge(file_profile)
+    else:
+        for path in pathlist:
+            _read_raw_metrics(path, recorded_data, routing, cache_dir, engine)
+
+    return recorded_data
+
+
+def _init_service_recorders(impl_details: dict, routing: dict[str, list[str]]) -> dict:
+    """
+    creates the base structure to collect raw data for all routed services
+    :param impl_details: dict with the implementation details of all services and their operations
+    :param routing: lookup of the recorded service name to the services it contributes to
+    """
+    return {
+        service: _init_metric_recorder(impl_details[service])
+        for services in routing.values()
+        for service in services
+    }
+
+
+def _aggregate_raw_metrics_file(
+    path: Path,
+    impl_details: dict,
+    routing: dict[str, list[str]],
+    cache_dir: str = None,
+    engine: str = "rows",
+    profile: bool = False,
+) -> tuple[dict, _Profile | None]:
+    """
+    collects the raw metric data of a single csv-file, used as a worker when parsing files in parallel
+    :param path: path to the csv-file
+    :param impl_details: dict with the implementation details of all services and their operations
+    :param routing: lookup of the recorded service name to the services it contributes to
+    :param cache_dir: directory of the columnar cache of the raw metrics, optional
+    :param engine: aggregation engine, "rows" or "columnar"
+    :param profile: collect the timings and counters of the worker
+    :returns: dict with details about invoked operations per service for this file only, and the profile of the worker
+    """
+    global _profile, _detail_spill
+    _profile = _Profile() if profile else None
+    # the details of a single file are not spilled, the limit applies to the details merged in the main process
+    _detail_spill = None
+    recorded_data = _init_service_recorders(impl_details, routing)
+    _read_raw_metrics(path, recorded_data, routing, cache_dir, engine)
+    if _profile:
+        # the details are added again when merging the files, and are counted there
+        _profile.counters.pop("details_recorded", None)
+    return recorded_data, _profile
+
+
+def _read_raw_metrics(
+    path: Path,
+    recorded_data: dict,
+    routing: dict[str, list[str]],
+    cache_dir: str = None,
+    engine: str = "rows",
+):
+    """
+    maps the rows of a single raw-metrics csv-file to the collected data of the services they contribute to,
+    reading them from the columnar cache if a cache directory is set
+    :param path: path to the csv-file
+    :param recorded_data: the collected metrics per service
+    :param routing: lookup of the recorded service name to the services it contributes to
+    :param cache_dir: directory of the columnar cache of the raw metrics, optional
+    :param engine: aggregation engine, "rows" or "columnar"
+    """
+    if engine == "columnar":
+        # without a cache directory, the columnar table is only created in memory
+        if cache_dir:
+            table = load_raw_metrics_table(path, cache_dir)
+        else:
+            with _profile_stage("convert_table"):
+                table = _convert_to_columnar_table(path)
+        with _profile_stage("aggregate", exclude=("sort_details", "spill")):
+            _aggregate_raw_metrics_table(table, path.stem, recorded_data, routing)
+    elif cache_dir:
+        table = load_raw_metrics_table(path, cache_dir)
+        _read_raw_metrics_table(table, path.stem, recorded_data, routing)
+    else:
+        _read_raw_metrics_file(path, recorded_data, routing)
+
+
+def _read_raw_metrics_file(path: Path, recorded_data: dict, routing: dict[str, list[str]]):
+    """
+    reads a single raw-metrics csv-file and maps each row to the collected data of the services it contributes to
+    :param path: path to the csv-file
+    :param recorded_data: the collected metrics per service
+    :param routing: lookup of the recorded service name to the services it contributes to
+    """
+    test_source = path.stem
+    # print(f"checking {str(path)}")
+    with open(path, "r") as csv_obj:
+        csv_reader = csv.reader(csv_obj)
+        header = next(csv_reader, [])
+        # resolve the columns that are used to filter the rows once, most rows are skipped without mapping them
+        service_col = _column_index(header, "service")
+        node_id_col = _column_index(header, "node_id")
+        test_node_id_col = _column_index(header, "test_node_id")
+        xfail_col = _column_index(header, "xfail")
+        if service_col is None:
+            return
+
+        if _profile:
+            csv_reader = _profile.timed_rows(csv_reader, "read_csv")
+        with _profile_stage("filter_rows", exclude=("read_csv", "aggregate", "sort_details", "spill")):
+            for row in csv_reader:
+                if not row:
+                    # empty lines are skipped, same as with the csv.DictReader
                     continue
-                
-                node_id = metric.get("node_id") or metric.get("test_node_id")
+                if len(row) < len(header):
+                    row += [None] * (len(header) - len(row))
+
+                service = row[service_col]
+                target_services = routing.get(service)
+                if not target_services:
+                    if _profile:
+                        _profile.count("skipped_other_service")
+                    continue
+
+                node_id = (node_id_col is not None and row[node_id_col]) or (
+                    test_node_id_col is not None and row[test_node_id_col]
+                )
                 if not node_id:
                     # some records do not have a node-id -> relates to requests in the background between tests
+                    if _profile:
+                        _profile.count("skipped_no_node_id")
                     continue
 
                 # skip tests are marked as xfail
-                if str(metric.get("xfail", "")).lower() == "true":
+                if xfail_col is not None and str(row[xfail_col]).lower() == "true":
+                    if _profile:
+                        _profile.count("skipped_xfail")
                     continue
 
-                op_name = metric.get("operation")
-                op_record = recorded_data.get(op_name)
-                if not op_record:
-                    # some operations are only "phantoms" (e.g. s3.PostObject)
-                    # and for docdb/neptune not all rds operations are available either -> we skip in that case
-                    #print(
-                    #    f"---> operation {metric.get('service')}.{metric.get('operation')} was not found"
-                    #)
-                    continue
+                metric = dict(zip(header, row))
+                _record_metric_for_services(recorded_data, target_services, metric, service, node_id, test_source)
 
-                internal_test = False
-                external_test = False
-
-                if test_source.startswith("community"):
-                    test_node_origin = "LocalStack Community"
-                    internal_test = True
-                    source = "ls_community"
-                elif test_source.startswith("pro"):
-                    test_node_origin = "LocalStack Pro"
-                    internal_test = True
-                    source = "ls_pro"
-                else:
-                    external_test = True
-
-
-                if external_test and metric.get("response_code") in ["500", "501"]:
-                    # some external tests (e.g seen for terraform) seem to succeed even though single operation calls fail
-                    # we do not include those as "passed tests"
-                    print(f"skipping {service}.{op_name}: response_code {metric.get('response_code')} ({test_source})")
-                    continue 
-
-                terraform_validated = True if test_source.startswith("terraform") else False
-                if internal_test and not op_record.get("internal_test_suite"):
-                    op_record["internal_test_suite"] = True
-                if external_test and not op_record.get("external_test_suite"):
-                    op_record["external_test_suite"] = True
-
-                aws_validated = (
-                    str(metric.get("aws_validated", "false")).lower() == "true"
-                )
 
-                # snapshot_tested is set if the test uses the snapshot-fixture + does not skip everything 
-                #   (pytest.marker.skip_snapshot_verify)
-                snapshot_tested = (
-                    str(metric.get("snapshot", "false")).lower() == "true"
-                    and metric.get("snapshot_skipped_paths", "") != "all"
-                )
+def _record_metric_for_services(
+    recorded_data: dict, target_services: list[str], metric: dict, service: str, node_id: str, test_source: str
+):
+    """
+    maps a single row of the raw metrics to the collected data of all services it contributes to
+    :param recorded_data: the collected metrics per service
+    :param target_services: the services the row contributes to
+    :param metric: the row of the raw metrics
+    :param service: name of the service as recorded in the raw metrics
+    :param node_id: node-id of the test that recorded the row
+    :param test_source: name of the csv-file the row was read from
+    """
+    if _profile:
+        mark = _profile.start(exclude=("sort_details", "spill"))
+    for target_service in target_services:
+        _record_metric(
+            recorded_data[target_service], metric, service, node_id, test_source
+        )
+    if _profile:
+        _profile.stop("aggregate", mark)
 
-                if snapshot_tested and not aws_validated:
-                    # the test did not have the marker aws_validated, but as it is snapshot_tested we can assume aws-validation
-                    aws_validated = True
 
-                if not op_record.get("snapshot_tested") and snapshot_tested:
-                    op_record["snapshot_tested"] = True
-                    op_record["aws_validated"] = True
+def _column_index(header: list[str], column: str) -> int | None:
+    """
+    returns the index of a column in the header, or None if the column does not exist.
+    If the column exists multiple times, the last one is used, same as with the csv.DictReader
+    :param header: the header of the csv-file
+    :param column: name of the column
+    """
+    for index in range(len(header) - 1, -1, -1):
+        if header[index] == column:
+            return index
+    return None
 
-                if not op_record.get("aws_validated") and aws_validated:
-                    op_record["aws_validated"] = True
 
-                if not op_record.get("terraform_test_suite") and terraform_validated:
-                    op_record["terraform_test_suite"] = True
+def load_raw_metrics_table(path: Path, cache_dir: str) -> dict:
+    """
+    returns the raw metrics of a csv-file as a columnar table. The table is read from the cache directory, the
+    csv-file is only parsed (and the cache updated) if it was not cached yet or changed since it was cached.
+    The table can also be used for ad-hoc analyses of the raw metrics:
+    {
+        "version": 2,
+        "source": {"sha256": "...", "mtime_ns": 0, "size": 0},
+        "header": ["service", "operation", ...],  # columns of the csv-file
+        "rows": 2,
+        "strings": ["sqs", "SendMessage", ...],  # dictionary of all string values
+        "columns": {
+            "service": array("I", [0, 0]),  # index in "strings", same for all CACHED_STRING_COLUMNS
+            "xfail": array("b", [0, 1]),  # same for all CACHED_BOOLEAN_COLUMNS
+            "response_code": array("i", [200, 400]),
+        },
+        "response_code_raw": {7: ""},  # rows whose response code is not a number, with the original value
+        # the response of the rows with a CommonServiceException, the type is only resolved for the recorded rows
+        "common_service_responses": {3: '{"__type": "QueueDoesNotExist"}'},
+    }
+    :param path: path to the csv-file
+    :param cache_dir: directory of the columnar cache
+    :returns: the columnar table
+    """
+    cache_path = Path(cache_dir).joinpath(
+        f"{path.stem}-{hashlib.sha256(str(path.resolve()).encode('utf-8')).hexdigest()[:16]}.pickle"
+    )
+    if cache_path.exists():
+        with open(cache_path, "rb") as fd, _profile_stage("load_table"):
+            table = pickle.load(fd)
+        if (
+            table.get("version") == COLUMNAR_CACHE_VERSION
+            and _fingerprint_file(path, table["source"])["sha256"] == table["source"]["sha256"]
+        ):
+            return table
 
-                if internal_test and not op_record["implemented"]:
-                    print(f"WARN: {service}.{op_name} classified as 'not implemented', but found a test calling it: ({source}) {node_id}")
-                    op_record["implemented"] = True
-                    op_record["availability"] = "pro" if source == "ls_pro" else "community"
-                
-                # test details currently only considered for internal test suite
-                # TODO might change when we include terraform test results
-                if not internal_test:
-                    continue
-                
-                # collect test details
-                details = recorded_data.setdefault("details", {})
-                # one dict for each operation
-                details_tests = details.setdefault(op_name, {})
-
-                # grouped by parameters
-                params = metric.get("parameters", "None").split(",")
-                params.sort()
-                parameters = ", ".join(params)
-                if not parameters:
-                    parameters = "- (without any parameters)"
-                
+    with _profile_stage("convert_table"):
+        table = _convert_to_columnar_table(path)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as fd:
+        pickle.dump(table, fd, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+    return table
+
+
+def _convert_to_columnar_table(path: Path) -> dict:
+    """
+    parses a raw-metrics csv-file into a columnar table, see load_raw_metrics_table
+    :param path: path to the csv-file
+    """
+    source = _fingerprint_file(path)
+    strings = []
+    string_ids = {}
+    columns = {column: array("I") for column in CACHED_STRING_COLUMNS}
+    columns.update({column: array("b") for column in CACHED_BOOLEAN_COLUMNS})
+    columns["response_code"] = array("i")
+    response_code_raw = {}
+    common_service_responses = {}
+
+    def _encode(value) -> int:
+        string_id = string_ids.get(value)
+        if string_id is None:
+            string_id = string_ids[value] = len(strings)
+            strings.append(value)
+        return string_id
+
+    with open(path, "r") as csv_obj:
+        csv_reader = csv.reader(csv_obj)
+        header = next(csv_reader, [])
+        rows = 0
+        for row in csv_reader:
+            if not row:
+                # empty lines are skipped, same as with the csv.DictReader
+                continue
+            if len(row) < len(header):
+                row += [None] * (len(header) - len(row))
+            metric = dict(zip(header, row))
+
+            values = {
+                "service": metric.get("service"),
+                "operation": metric.get("operation"),
+                "node_id": metric.get("node_id") or metric.get("test_node_id") or None,
+                "parameters": metric.get("parameters"),
+                "exception": metric.get("exception"),
+                "snapshot_skipped_paths": metric.get("snapshot_skipped_paths"),
+                "origin": metric.get("origin"),
+            }
+            for column, value in values.items():
+                columns[column].append(_encode(value))
+            for column in CACHED_BOOLEAN_COLUMNS:
+                columns[column].append(str(metric.get(column, "false")).lower() == "true")
+            if metric.get("exception") == "CommonServiceException" and "response_data" in metric:
+                common_service_responses[rows] = metric["response_data"]
+
+            response_code = metric.get("response_code")
+            if (
+                isinstance(response_code, str)
+                and response_code.isdigit()
+                and len(response_code) < 10
+                and str(int(response_code)) == response_code
+            ):
+                columns["response_code"].append(int(response_code))
+            else:
+                columns["response_code"].append(-1)
+                response_code_raw[rows] = response_code
+            rows += 1
+
+    return {
+        "version": COLUMNAR_CACHE_VERSION,
+        "source": source,
+        "header": header,
+        "rows": rows,
+        "strings": strings,
+        "columns": columns,
+        "response_code_raw": response_code_raw,
+        "common_service_responses": common_service_responses,
+    }
+
+
+def _read_raw_metrics_table(
+    table: dict, test_source: str, recorded_data: dict, routing: dict[str, list[str]]
+):
+    """
+    maps the rows of a columnar table of the raw metrics to the collected data of the services they contribute to,
+    same as _read_raw_metrics_file
+    :param table: the columnar table, see load_raw_metrics_table
+    :param test_source: name of the csv-file the table was created from
+    :param recorded_data: the collected metrics per service
+    :param routing: lookup of the recorded service name to the services it contributes to
+    """
+    strings = table["strings"]
+    columns = table["columns"]
+    read_metric = _table_metric_reader(table)
+
+    # resolve the routing once per distinct service name instead of once per row
+    targets_by_id = [routing.get(value) for value in strings]
+    services = columns["service"]
+    node_ids = columns["node_id"]
+    xfails = columns["xfail"]
+    routed = [targets_by_id[service_id] for service_id in services]
+    if _profile:
+        _profile.count("rows_read", table["rows"])
+        _profile.count("skipped_other_service", routed.count(None))
+    with _profile_stage("filter_rows", exclude=("aggregate", "sort_details", "spill")):
+        for row in compress(range(table["rows"]), routed):
+            node_id = strings[node_ids[row]]
+            if not node_id:
+                # some records do not have a node-id -> relates to requests in the background between tests
+                if _profile:
+                    _profile.count("skipped_no_node_id")
+                continue
+            # skip tests are marked as xfail
+            if xfails[row]:
+                if _profile:
+                    _profile.count("skipped_xfail")
+                continue
+
+            metric = read_metric(row)
+            service = strings[services[row]]
+            _record_metric_for_services(
+                recorded_data, targets_by_id[services[row]], metric, service, node_id, test_source
+            )
+
+
+def _table_metric_reader(table: dict):
+    """
+    returns a function which maps a row of a columnar table of the raw metrics to a dict, like the rows of the
+    csv.DictReader. Columns which do not exist in the csv-file are not part of the dict, so the defaults apply.
+    The "response_data" is only part of the dict for the rows with a CommonServiceException.
+    :param table: the columnar table, see load_raw_metrics_table
+    """
+    strings = table["strings"]
+    columns = table["columns"]
+    response_code_raw = table["response_code_raw"]
+    header = set(table["header"])
+    string_columns = [
+        (column, columns[column])
+        for column in ("operation", "parameters", "snapshot_skipped_paths", "origin")
+        if column in header
+    ]
+    boolean_columns = [(column, columns[column]) for column in ("aws_validated", "snapshot") if column in header]
+    exceptions = columns["exception"] if "exception" in header else None
+    common_service_responses = table["common_service_responses"]
+    response_codes = columns["response_code"] if "response_code" in header else None
+
+    def _read_metric(row: int) -> dict:
+        metric = {column: strings[values[row]] for column, values in string_columns}
+        metric.update({column: bool(values[row]) for column, values in boolean_columns})
+        if exceptions is not None:
+            metric["exception"] = strings[exceptions[row]]
+        if row in common_service_responses:
+            metric["response_data"] = common_service_responses[row]
+        if response_codes is not None:
+            metric["response_code"] = (
+                response_code_raw[row] if row in response_code_raw else str(response_codes[row])
+            )
+        return metric
+
+    return _read_metric
+
+
+def _aggregate_raw_metrics_table(
+    table: dict, test_source: str, recorded_data: dict, routing: dict[str, list[str]]
+):
+    """
+    maps a columnar table of the raw metrics to the collected data of the services, with the same result as
+    _read_raw_metrics_table. Instead of evaluating every row, the operation flags are computed as grouped
+    any-reductions over whole columns: the set of (service, operation) pairs of all rows that set a flag.
+    Only the rows of the internal test suites are still evaluated one by one, to collect the test details.
+    :param table: the columnar table, see load_raw_metrics_table
+    :param test_source: name of the csv-file the table was created from
+    :param recorded_data: the collected metrics per service
+    :param routing: lookup of the recorded service name to the services it contributes to
+    """
+    strings = table["strings"]
+    columns = table["columns"]
+    rows = table["rows"]
+    services = columns["service"]
+    operations = columns["operation"]
+
+    source, terraform_validated = _test_suite(test_source)
+    internal_test = source is not None
+
+    # lookups per distinct string instead of per row
+    targets_by_id = [routing.get(value) for value in strings]
+    routed_by_id = [bool(targets) for targets in targets_by_id]
+    truthy_by_id = [bool(value) for value in strings]
+
+    # mask of the rows which are recorded: routed service, with node-id, not xfail
+    recorded = map(and_, map(routed_by_id.__getitem__, services), map(truthy_by_id.__getitem__, columns["node_id"]))
+    recorded = list(map(and_, recorded, map(not_, columns["xfail"])))
+    if _profile:
+        # the counters are only computed when profiling, they are not needed for the aggregation
+        routed = list(map(routed_by_id.__getitem__, services))
+        with_node_id = list(map(and_, routed, map(truthy_by_id.__getitem__, columns["node_id"])))
+        _profile.count("rows_read", rows)
+        _profile.count("skipped_other_service", rows - sum(routed))
+        _profile.count("skipped_no_node_id", sum(routed) - sum(with_node_id))
+        _profile.count("skipped_xfail", sum(with_node_id) - sum(recorded))
+        # rows per (service, operation) pair before the response codes are checked, as with the row-wise evaluation
+        routed_rows_per_key = Counter(compress(zip(services, operations), recorded))
+    if not internal_test:
+        response_codes = columns["response_code"]
+        failed_by_code = {code: _is_failed_external_call(str(code)) for code in set(response_codes)}
+        failed = list(map(failed_by_code.__getitem__, response_codes))
+        for row in compress(range(rows), map(and_, recorded, failed)):
+            service = strings[services[row]]
+            op_name = strings[operations[row]]
+            for target_service in targets_by_id[services[row]]:
+                if recorded_data[target_service].get(op_name):
+                    print(f"skipping {service}.{op_name}: response_code {response_codes[row]} ({test_source})")
+                    if _profile:
+                        _profile.count("skipped_external_5xx")
+        recorded = list(map(and_, recorded, map(not_, failed)))
+
+    snapshot_tested = list(
+        map(_is_snapshot_tested, map(bool, columns["snapshot"]), map(strings.__getitem__, columns["snapshot_skipped_paths"]))
+    )
+    aws_validated = list(map(_is_aws_validated, map(bool, columns["aws_validated"]), snapshot_tested))
+
+    # grouped any-reductions: all (service, operation) pairs with at least one row setting the flag
+    keys = list(zip(services, operations))
+    recorded_keys = list(compress(keys, recorded))
+    # the first recorded row of each pair, used to report operations which are not classified as implemented
+    first_rows = dict(zip(reversed(recorded_keys), reversed(list(compress(range(rows), recorded)))))
+    aws_validated_keys = set(compress(keys, map(and_, recorded, aws_validated)))
+    snapshot_tested_keys = set(compress(keys, map(and_, recorded, snapshot_tested)))
+
+    if _profile:
+        # pairs which are skipped entirely because of their response codes, are not part of first_rows
+        for key, count in routed_rows_per_key.items():
+            for target_service in targets_by_id[key[0]]:
+                if not recorded_data[target_service].get(strings[key[1]]):
+                    _profile.count("skipped_unknown_operation", count)
+
+    # in the order of the first row, so operations are reported (and classified) as with the row-wise evaluation
+    for key, first_row in sorted(first_rows.items(), key=itemgetter(1)):
+        service_id, operation_id = key
+        service = strings[service_id]
+        op_name = strings[operation_id]
+        for target_service in targets_by_id[service_id]:
+            op_record = recorded_data[target_service].get(op_name)
+            if not op_record:
+                # some operations are only "phantoms" (e.g. s3.PostObject)
+                # and for docdb/neptune not all rds operations are available either -> we skip in that case
+                continue
+            _mark_tested_operation(
+                op_record, source, terraform_validated, key in aws_validated_keys, key in snapshot_tested_keys
+            )
+            if internal_test and not op_record["implemented"]:
+                _promote_tested_operation(op_record, service, op_name, source, strings[columns["node_id"][first_row]])
+
+    # test details currently only considered for internal test suite
+    if not internal_test:
+        return
+    read_metric = _table_metric_reader(table)
+    node_ids = columns["node_id"]
+    for row in compress(range(rows), recorded):
+        metric = read_metric(row)
+        for target_service in targets_by_id[services[row]]:
+            if recorded_data[target_service].get(metric.get("operation")):
+                _record_test_detail(
+                    recorded_data[target_service],
+                    metric,
+                    strings[node_ids[row]],
+                    source,
+                    bool(aws_validated[row]),
+                    bool(snapshot_tested[row]),
+                )
+
+
+def _merge_recorded_data(recorded_data: dict, file_data: dict):
+    """
+    merges the data collected from a single csv-file into the overall collected data.
+    Merging the files in the order they would be read sequentially results in the same data.
+    :param recorded_data: the collected metrics per service, will be updated
+    :param file_data: the collected metrics per service of a single file
+    """
+    for service, metrics in file_data.items():
+        service_data = recorded_data[service]
+        for op_name, op_record in metrics.items():
+            if op_name == "details":
+                continue
+            target_record = service_data[op_name]
+            if op_record["implemented"] and not target_record["implemented"]:
+                # the operation was classified as 'not implemented', but a test in this file called it
+                target_record["implemented"] = True
+                target_record["availability"] = op_record["availability"]
+            for flag in (
+                "internal_test_suite",
+                "external_test_suite",
+                "terraform_test_suite",
+                "aws_validated",
+                "snapshot_tested",
+            ):
+                if op_record[flag]:
+                    target_record[flag] = True
+
+        for op_name, params in metrics.get("details", {}).items():
+            details_tests = service_data.setdefault("details", {}).setdefault(op_name, {})
+            for parameters, test_suites in params.items():
                 param_test_details = details_tests.setdefault(parameters, {})
+                for source, tests in test_suites.items():
+                    test_list = param_test_details.setdefault(source, _TestList())
+                    for test_detail in tests:
+                        test_list.add(test_detail)
+        if _detail_spill:
+            _detail_spill.check()
 
-                # separate lists for source ("ls_community" and "ls_pro")
-                test_list = param_test_details.setdefault(source, [])
-
-                if param_exception := metric.get("exception", ""):
-                    if param_exception == "CommonServiceException":
-                        # try to get more details about the CommonServiceException from the response
-                        try:
-                            data = json.loads(metric.get("response_data", "{}"))
-                            param_exception = data.get("__type", param_exception)
-                        except JSONDecodeError:
-                            # in this case we just keep the original "CommonServiceException" information
-                            pass
-
-                # get simple test name (will be shown on coverage page)
-                if node_id.endswith("]"):
-                    # workaround for tests that have a "::" as part of a parameterized test
-                    # e.g. tests/integration/mytest.py::SomeTest::test_and_or_functions[Fn::Or-0-0-False]
-                    tmp = node_id[0 : node_id.rfind("[")].split("::")[-1]
-                    simple_test_name = tmp + node_id[node_id.rfind("[") :]
-                else:
-                    simple_test_name = node_id.split("::")[-1]
-                test_detail = {
-                    "node_id": f"{test_node_origin}: {node_id}",
-                    "test": simple_test_name,
-                    "response": metric.get("response_code", -1),
-                    "error": param_exception,
-                    "snapshot_skipped": metric.get("snapshot_skipped_paths", ""),
-                    "aws_validated": aws_validated,
-                    "snapshot_tested": snapshot_tested,
-                    "origin": metric.get("origin", ""),
-                }
-                if test_detail not in test_list:
-                    # avoid duplicates
-                    test_list.append(test_detail)
 
-    return recorded_data
+def _resolve_exception(metric: dict) -> str:
+    """
+    returns the exception of a raw metric row, with more details about a CommonServiceException from the response
+    :param metric: the row of the raw metrics
+    """
+    if param_exception := metric.get("exception", ""):
+        if param_exception == "CommonServiceException":
+            # try to get more details about the CommonServiceException from the response
+            param_exception = _common_service_exception_type(metric.get("response_data", "{}"))
+    return param_exception
+
+
+def _common_service_exception_type(response_data: str) -> str:
+    """
+    returns the "__type" of the response of a CommonServiceException, or "CommonServiceException" if there is none.
+    The same responses are recorded by many rows (e.g. parameterized tests), so the results of the responses up to
+    MEMOIZED_RESPONSE_SIZE characters are cached. Larger responses are parsed every time, they are not kept alive
+    by the cache.
+    :param response_data: the response of the raw metrics row
+    """
+    if isinstance(response_data, str) and len(response_data) <= MEMOIZED_RESPONSE_SIZE:
+        return _memoized_exception_type(response_data)
+    return _parse_exception_type(response_data)
+
+
+def _parse_exception_type(response_data: str) -> str:
+    """parses the "__type" of the response of a CommonServiceException, see _common_service_exception_type"""
+    try:
+        data = json.loads(response_data)
+    except (JSONDecodeError, TypeError):
+        # in this case we just keep the original "CommonServiceException" information
+        return "CommonServiceException"
+    if not isinstance(data, dict):
+        # e.g. a list or null as response
+        return "CommonServiceException"
+    return data.get("__type", "CommonServiceException")
+
+
+_memoized_exception_type = lru_cache(maxsize=4096)(_parse_exception_type)
+
+
+# the rules below are shared by the row-wise evaluation (_record_metric) and the columnar one
+# (_aggregate_raw_metrics_table), so both engines classify the rows the same way
+
+
+def _test_suite(test_source: str) -> tuple[str | None, bool]:
+    """
+    returns the internal test suite of a csv-file ("ls_community" or "ls_pro", None for the external test suites),
+    and whether it is the terraform test suite
+    :param test_source: name of the csv-file, e.g. "community-integration-test"
+    """
+    source = None
+    if test_source.startswith("community"):
+        source = "ls_community"
+    elif test_source.startswith("pro"):
+        source = "ls_pro"
+    return source, test_source.startswith("terraform")
+
+
+def _is_failed_external_call(response_code: str) -> bool:
+    """
+    some external tests (e.g seen for terraform) seem to succeed even though single operation calls fail
+    we do not include those as "passed tests"
+    :param response_code: the response code of the raw metrics row
+    """
+    return response_code in ["500", "501"]
+
+
+def _is_snapshot_tested(snapshot: bool, snapshot_skipped_paths: str) -> bool:
+    """
+    snapshot_tested is set if the test uses the snapshot-fixture + does not skip everything
+    (pytest.marker.skip_snapshot_verify)
+    """
+    return snapshot and snapshot_skipped_paths != "all"
+
+
+def _is_aws_validated(aws_validated: bool, snapshot_tested: bool) -> bool:
+    """
+    if the test did not have the marker aws_validated, but it is snapshot_tested, we can assume aws-validation
+    """
+    return aws_validated or snapshot_tested
+
+
+def _mark_tested_operation(
+    op_record: dict, source: str | None, terraform_validated: bool, aws_validated: bool, snapshot_tested: bool
+):
+    """
+    sets the flags of an operation which is called by a test of the test suite
+    :param op_record: the collected metrics of the operation
+    :param source: the internal test suite, None for the external test suites
+    :param terraform_validated: whether the test suite is the terraform test suite
+    :param aws_validated: whether the test is aws-validated
+    :param snapshot_tested: whether the test is snapshot-tested
+    """
+    op_record["internal_test_suite" if source else "external_test_suite"] = True
+    if terraform_validated:
+        op_record["terraform_test_suite"] = True
+    if snapshot_tested:
+        op_record["snapshot_tested"] = True
+    if aws_validated:
+        op_record["aws_validated"] = True
+
+
+def _promote_tested_operation(op_record: dict, service: str, op_name: str, source: str, node_id: str):
+    """
+    marks an operation as implemented, which is classified as 'not implemented' but is called by an internal test
+    :param op_record: the collected metrics of the operation
+    :param service: name of the service as recorded in the raw metrics
+    :param op_name: name of the operation
+    :param source: the internal test suite, "ls_community" or "ls_pro"
+    :param node_id: node-id of the test that called the operation
+    """
+    print(f"WARN: {service}.{op_name} classified as 'not implemented', but found a test calling it: ({source}) {node_id}")
+    op_record["implemented"] = True
+    op_record["availability"] = "pro" if source == "ls_pro" else "community"
+
+
+def _record_metric(
+    recorded_data: dict, metric: dict, service: str, node_id: str, test_source: str
+):
+    """
+    maps a single row of the raw metrics to the collected data of a service
+    :param recorded_data: the collected metrics for the service, as created by _init_metric_recorder
+    :param metric: the row of the raw metrics
+    :param service: name of the service as recorded in the raw metrics
+    :param node_id: node-id of the test that recorded the row
+    :param test_source: name of the csv-file the row was read from, e.g. "community-integration-test"
+    """
+    op_name = metric.get("operation")
+    op_record = recorded_data.get(op_name)
+    if not op_record:
+        # some operations are only "phantoms" (e.g. s3.PostObject)
+        # and for docdb/neptune not all rds operations are available either -> we skip in that case
+        #print(
+        #    f"---> operation {metric.get('service')}.{metric.get('operation')} was not found"
+        #)
+        if _profile:
+            _profile.count("skipped_unknown_operation")
+        return
+
+    source, terraform_validated = _test_suite(test_source)
+    internal_test = source is not None
+
+    if not internal_test and _is_failed_external_call(metric.get("response_code")):
+        print(f"skipping {service}.{op_name}: response_code {metric.get('response_code')} ({test_source})")
+        if _profile:
+            _profile.count("skipped_external_5xx")
+        return
+
+    snapshot_tested = _is_snapshot_tested(
+        str(metric.get("snapshot", "false")).lower() == "true", metric.get("snapshot_skipped_paths", "")
+    )
+    aws_validated = _is_aws_validated(str(metric.get("aws_validated", "false")).lower() == "true", snapshot_tested)
+    _mark_tested_operation(op_record, source, terraform_validated, aws_validated, snapshot_tested)
+
+    if internal_test and not op_record["implemented"]:
+        _promote_tested_operation(op_record, service, op_name, source, node_id)
+    
+    # test details currently only considered for internal test suite
+    # TODO might change when we include terraform test results
+    if not internal_test:
+        return
+
+    _record_test_detail(recorded_data, metric, node_id, source, aws_validated, snapshot_tested)
+
+
+def _record_test_detail(
+    recorded_data: dict,
+    metric: dict,
+    node_id: str,
+    source: str,
+    aws_validated: bool,
+    snapshot_tested: bool,
+):
+    """
+    adds the details about the test of a single row of the internal test suites to the collected data of a service
+    :param recorded_data: the collected metrics for the service
+    :param metric: the row of the raw metrics
+    :param node_id: node-id of the test that recorded the row
+    :param source: the internal test suite, "ls_community" or "ls_pro"
+    :param aws_validated: whether the test is aws-validated
+    :param snapshot_tested: whether the test is snapshot-tested
+    """
+    op_name = metric.get("operation")
+    test_node_origin = "LocalStack Pro" if source == "ls_pro" else "LocalStack Community"
+
+    # collect test details
+    details = recorded_data.setdefault("details", {})
+    # one dict for each operation
+    details_tests = details.setdefault(op_name, {})
+
+    # grouped by parameters
+    params = metric.get("parameters", "None").split(",")
+    params.sort()
+    parameters = sys.intern(", ".join(params))
+    if not parameters:
+        parameters = "- (without any parameters)"
+    
+    param_test_details = details_tests.setdefault(parameters, {})
+
+    # separate lists for source ("ls_community" and "ls_pro")
+    test_list = param_test_details.setdefault(source, _TestList())
+
+    param_exception = _resolve_exception(metric)
+
+    # get simple test name (will be shown on coverage page)
+    if node_id.endswith("]"):
+        # workaround for tests that have a "::" as part of a parameterized test
+        # e.g. tests/integration/mytest.py::SomeTest::test_and_or_functions[Fn::Or-0-0-False]
+        tmp = node_id[0 : node_id.rfind("[")].split("::")[-1]
+        simple_test_name = tmp + node_id[node_id.rfind("[") :]
+    else:
+        simple_test_name = node_id.split("::")[-1]
+    # the same strings are repeated for many rows (e.g. every call of a test), they are only kept once in memory
+    test_detail = _TestDetail(
+        node_id=sys.intern(f"{test_node_origin}: {node_id}"),
+        test=sys.intern(simple_test_name),
+        response=_intern(metric.get("response_code", -1)),
+        error=_intern(param_exception),
+        snapshot_skipped=_intern(metric.get("snapshot_skipped_paths", "")),
+        aws_validated=aws_validated,
+        snapshot_tested=snapshot_tested,
+        origin=_intern(metric.get("origin", "")),
+    )
+    test_list.add(test_detail)
+    if _detail_spill:
+        _detail_spill.check()
+
+
+def _intern(value):
+    """interns the value if it is a string, the columns of the raw metrics might also be missing (None)"""
+    return sys.intern(value) if isinstance(value, str) else value
 
 
 def print_usage():
@@ -377,6 +1637,14 @@ if __name__ == "__main__":
     argParser.add_argument("-r", "--raw-metrics", required=True, help="path to raw metrics")
     argParser.add_argument("-o", "--output-dir", required=True, help="directory where the generated files will be stored")
     argParser.add_argument("-s", "--service-details-json", help="path to service_display_name.json")
+    argParser.add_argument("-m", "--manifest", help="path to a manifest of the input files, only services with changed input are regenerated")
+    argParser.add_argument("-c", "--cache-dir", help="directory for a columnar cache of the raw metrics, speeds up repeated runs")
+    argParser.add_argument("-e", "--engine", choices=["rows", "columnar"], default="rows", help="aggregation engine for the raw metrics (default: rows)")
+    argParser.add_argument("--split-details", action="store_true", help="store the test details of each operation in a separate file details/<service>/<operation>.json")
+    argParser.add_argument("--minify", action="store_true", help="write the json-files without indentation")
+    argParser.add_argument("-j", "--jobs", type=int, default=1, help="number of processes used to parse the raw metrics (default: 1)")
+    argParser.add_argument("--profile", help="path to a json-file to store the timings of the stages and counters of the run")
+    argParser.add_argument("--max-details", type=int, help="maximum number of test details kept in memory, further details are spilled to disk (default: no limit)")
 
     args = argParser.parse_args()
 
@@ -393,4 +1661,12 @@ if __name__ == "__main__":
         path_to_raw_metrics=args.raw_metrics,
         target_dir=args.output_dir,
         service_lookup_details=args.service_details_json,
+        jobs=args.jobs,
+        manifest_file=args.manifest,
+        cache_dir=args.cache_dir,
+        engine=args.engine,
+        split_details=args.split_details,
+        minify=args.minify,
+        profile_file=args.profile,
+        max_details=args.max_details,
     )
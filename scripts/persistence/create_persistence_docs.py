@@ -1,59 +1,79 @@
 import os
+import re
+import shutil
+import threading
 from io import BytesIO
 import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
 from pathlib import Path
 import notion_client as n_client
-import frontmatter
 from ruamel.yaml import YAML
-from frontmatter.default_handlers import YAMLHandler, DEFAULT_POST_TEMPLATE
+from frontmatter.default_handlers import YAMLHandler
 from notion.catalog import PersistenceCatalog
 
 token = os.getenv("NOTION_TOKEN")
+# the API of a local stand-in server can be used instead of Notion, e.g. for testing
+notion_base_url = os.getenv("NOTION_BASE_URL")
+# optional local snapshot of the catalog (e.g. .notion_catalog_snapshot.json), later syncs only request the items
+# edited since then. Without it, all items are requested on every run
+catalog_snapshot = os.getenv("NOTION_CATALOG_SNAPSHOT")
+# request all items of the catalog, this is needed to remove deleted items from the snapshot. It is done anyway if
+# the last full refresh is older than NOTION_SNAPSHOT_MAX_AGE_DAYS
+full_refresh = os.getenv("NOTION_FULL_REFRESH", "").lower() in ("1", "true")
+snapshot_max_age = timedelta(days=float(os.getenv("NOTION_SNAPSHOT_MAX_AGE_DAYS", "7")))
 markdown_path = "../../src/content/docs/aws/services"
 persistence_path = "../../src/data/persistence"
 persistence_data = os.path.join(persistence_path, "coverage.json")
+# a line delimiting the frontmatter, same as the frontmatter.YAMLHandler
+frontmatter_delimiter = re.compile(rb"^-{3,}\s*$")
+service_display_names = "../../src/data/coverage/service_display_name.json"
 
 
 class CustomYAMLHandler(YAMLHandler):
+    """
+    Handler which keeps the quotes and formatting of the frontmatter. The same handler can be used for all pages,
+    the YAML instance is only configured once per thread, as it cannot be shared between threads.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._local = threading.local()
+
+    @property
+    def yaml(self) -> YAML:
+        if (yaml := getattr(self._local, "yaml", None)) is None:
+            yaml = YAML()
+            yaml.default_flow_style = False
+            yaml.preserve_quotes = True
+            self._local.yaml = yaml
+        return yaml
 
     def load(self, fm: str, **kwargs: object):
-        yaml = YAML()
-        yaml.default_flow_style = False
-        yaml.preserve_quotes = True
-        return yaml.load(fm, **kwargs)  # type: ignore[arg-type]
+        return self.yaml.load(fm, **kwargs)  # type: ignore[arg-type]
 
     def export(self, metadata: dict[str, object], **kwargs: object) -> str:
-        yaml = YAML()
-        yaml.default_flow_style = False
         from io import StringIO
         stream = StringIO()
-        yaml.dump(metadata, stream)
+        self.yaml.dump(metadata, stream)
         return stream.getvalue().rstrip()
 
-    def format(self, post, **kwargs):
-        """
-        Simple customization to avoid removing the last line.
-        """
-        start_delimiter = kwargs.pop("start_delimiter", self.START_DELIMITER)
-        end_delimiter = kwargs.pop("end_delimiter", self.END_DELIMITER)
 
-        metadata = self.export(post.metadata, **kwargs)
-
-        return DEFAULT_POST_TEMPLATE.format(
-            metadata=metadata,
-            content=post.content,
-            start_delimiter=start_delimiter,
-            end_delimiter=end_delimiter,
-        ).lstrip()
-
-
-def lookup_full_name(shortname: str) -> str:
-    """Given the short default name of a service, looks up for the full name"""
-    service_lookup = Path("../../src/data/coverage/service_display_name.json")
+@lru_cache(maxsize=None)
+def load_service_display_names() -> dict:
+    """Reads the display names of all services once, the same index is returned for every lookup"""
+    service_lookup = Path(service_display_names)
     service_info = {}
     if service_lookup.exists() and service_lookup.is_file():
         with open(service_lookup, "r") as f:
             service_info = json.load(f)
+    return service_info
+
+
+def lookup_full_name(shortname: str) -> str:
+    """Given the short default name of a service, looks up for the full name"""
+    service_info = load_service_display_names()
 
     service_name_title = shortname
 
@@ -68,11 +88,13 @@ def collect_status() -> dict:
     """Reads the catalog on Notion and returns the status of persistence for each service"""
     if not token:
         print("Aborting, please provide a NOTION_TOKEN in the env") 
-    notion_client = n_client.Client(auth=token)
+    options = {"base_url": notion_base_url} if notion_base_url else {}
+    notion_client = n_client.Client(auth=token, **options)
     
     catalog_db = PersistenceCatalog(notion_client=notion_client)
+    items = catalog_db.sync(catalog_snapshot, full_refresh, snapshot_max_age) if catalog_snapshot else catalog_db
     statuses = {}
-    for item in catalog_db:
+    for item in items:
         # we do not want some services to be mentioned in the docs (for instance, not yet released)
         if item.exclude:
             continue
@@ -105,8 +127,9 @@ def collect_status() -> dict:
     return statuses
 
     
-def update_frontmatter(statuses: dict):
-    """Updates the frontmatter of the service page in the user guide Markdown file"""
+def update_frontmatter(statuses: dict, jobs: int = 8):
+    """Updates the frontmatter of the service page in the user guide Markdown file, if it changed"""
+    pages = {}
     for service, values in statuses.items():
 
         # a bunch of special cases
@@ -125,12 +148,63 @@ def update_frontmatter(statuses: dict):
             # we don't want to modify the frontmatter for the services not supporting persistence
             continue
 
-        # open the markdown file and read the content
-        content = frontmatter.load(_path, handler=CustomYAMLHandler())
-        desc = content.metadata["description"]
-        content.metadata["description"] = desc.strip()
-        content.metadata["persistence"] = values.get("support", "unknown")
-        frontmatter.dump(content, _path)
+        # multiple services can share a page, the last one wins
+        pages[_path] = values.get("support", "unknown")
+
+    handler = CustomYAMLHandler()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        updated = sum(executor.map(lambda page: update_page_frontmatter(*page, handler), pages.items()))
+    print(f"Updated the frontmatter of {updated} of {len(pages)} service pages")
+
+
+def update_page_frontmatter(path: str, support: str, handler: CustomYAMLHandler) -> bool:
+    """Sets the persistence support in the frontmatter of a page, the page is only written if the frontmatter changed"""
+    # only the frontmatter of the markdown file is read, the content stays untouched
+    metadata, content_offset = read_frontmatter(path, handler)
+    desc = metadata["description"]
+    if desc == desc.strip() and metadata.get("persistence") == support:
+        return False
+    metadata["description"] = desc.strip()
+    metadata["persistence"] = support
+    write_frontmatter(path, metadata, content_offset, handler)
+    return True
+
+
+def read_frontmatter(path: str, handler: CustomYAMLHandler) -> tuple[dict, int]:
+    """
+    Reads the frontmatter of a page, the file is only read up to the closing delimiter.
+    Returns the metadata, and the offset in bytes where the content after the closing delimiter starts.
+    """
+    with open(path, "rb") as f:
+        if not frontmatter_delimiter.match(f.readline()):
+            raise ValueError(f"{path} does not start with a frontmatter")
+        lines = []
+        while line := f.readline():
+            if frontmatter_delimiter.match(line):
+                # a plain dict like frontmatter.parse, so the dump does not keep the styles of the loaded scalars
+                metadata = handler.load(b"".join(lines).decode("utf-8"))
+                return dict(metadata) if isinstance(metadata, dict) else {}, f.tell()
+            lines.append(line)
+    raise ValueError(f"{path} has no closing delimiter of the frontmatter")
+
+
+def write_frontmatter(path: str, metadata: dict, content_offset: int, handler: CustomYAMLHandler):
+    """
+    Replaces the frontmatter of a page, the content after the closing delimiter (content_offset) is copied as it is.
+    The page is written to a temporary file first, which then replaces the page.
+    """
+    header = f"{handler.START_DELIMITER}\n{handler.export(metadata)}\n{handler.END_DELIMITER}\n"
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(path, "rb") as source, open(tmp_path, "wb") as target:
+            target.write(header.encode("utf-8"))
+            source.seek(content_offset)
+            shutil.copyfileobj(source, target)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
 
 
 if __name__ == "__main__":
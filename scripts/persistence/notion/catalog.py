@@ -1,5 +1,11 @@
 """Models for the notion service catalog https://www.notion.so/localstack/3c0f615e7ffc4ae2a034f1ed9c444bd2"""
 
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+
 from notion_client import Client as NotionClient
 
 from notion_objects import (
@@ -15,6 +21,25 @@ from notion_objects import (
 DEFAULT_CATALOG_DATABASE_ID = "3c0f615e7ffc4ae2a034f1ed9c444bd2"
 
 
+def query_pages(notion_client: NotionClient, database_id: str, **query) -> Iterator[dict]:
+    """
+    Yields the raw page objects of a database query.
+    Notion paginates with cursors, so the pages of results can only be requested one after another, but the next page
+    is already requested in the background while the results of the current one are processed.
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        response = executor.submit(notion_client.databases.query, database_id, **query)
+        while True:
+            results = response.result()
+            if results.get("has_more"):
+                response = executor.submit(
+                    notion_client.databases.query, database_id, **query, start_cursor=results["next_cursor"]
+                )
+            yield from results["results"]
+            if not results.get("has_more"):
+                return
+
+
 class PersistenceServiceItem(Page):
     name = TitlePlainText("Name")
     status = Status("Persistence")
@@ -28,3 +53,60 @@ class PersistenceServiceItem(Page):
 class PersistenceCatalog(Database[PersistenceServiceItem]):
     def __init__(self, notion_client: NotionClient, database_id: str | None = None):
         super().__init__(PersistenceServiceItem, database_id or DEFAULT_CATALOG_DATABASE_ID, notion_client)
+
+    def __iter__(self):
+        for page in query_pages(self.client, self.database_id, page_size=self.default_page_size):
+            yield self.type(page)
+
+    def sync(
+        self, snapshot_file: str, full_refresh: bool = False, max_age: timedelta | None = None
+    ) -> list[PersistenceServiceItem]:
+        """
+        Returns all items of the catalog, and stores their raw page objects in a local snapshot.
+        If a snapshot of an earlier sync exists, only the items edited since then are requested from Notion.
+        A query for the edited items does not return the items deleted from the catalog, they are only removed from
+        the snapshot with a full refresh. A full refresh is done if the last one is older than max_age.
+        """
+        synced_at = datetime.now(timezone.utc)
+        snapshot = {}
+        if not full_refresh and os.path.exists(snapshot_file):
+            with open(snapshot_file, "r") as f:
+                snapshot = json.load(f)
+            if snapshot.get("database_id") != self.database_id or "refreshed_at" not in snapshot:
+                snapshot = {}
+            elif max_age is not None and synced_at - datetime.fromisoformat(snapshot["refreshed_at"]) > max_age:
+                snapshot = {}
+
+        refreshed_at = snapshot["refreshed_at"] if snapshot else synced_at.isoformat()
+        query = {"page_size": self.default_page_size}
+        pages = {}
+        if snapshot:
+            pages = {page["id"]: page for page in snapshot["pages"]}
+            # Notion rounds the last_edited_time down to the minute, so the items edited within the minute of the
+            # last sync are requested again
+            edited_since = datetime.fromisoformat(snapshot["synced_at"]).replace(second=0, microsecond=0)
+            query["filter"] = {
+                "timestamp": "last_edited_time",
+                "last_edited_time": {"on_or_after": edited_since.isoformat()},
+            }
+
+        for page in query_pages(self.client, self.database_id, **query):
+            pages[page["id"]] = page
+        pages = {
+            page_id: page
+            for page_id, page in pages.items()
+            if not page.get("archived") and not page.get("in_trash")
+        }
+
+        with open(snapshot_file, "w") as f:
+            json.dump(
+                {
+                    "database_id": self.database_id,
+                    "synced_at": synced_at.isoformat(),
+                    "refreshed_at": refreshed_at,
+                    "pages": list(pages.values()),
+                },
+                f,
+                indent=2,
+            )
+        return [self.type(page) for page in pages.values()]
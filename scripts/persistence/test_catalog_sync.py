@@ -0,0 +1,145 @@
+"""
+Checks PersistenceCatalog.sync against a local stand-in of the Notion API, without a NOTION_TOKEN:
+    python test_catalog_sync.py
+The stand-in serves the pages of a database query with cursor pagination and the last_edited_time filter.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from notion_client import Client as NotionClient
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from notion.catalog import PersistenceCatalog  # noqa: E402
+
+OLD_EDIT = "2024-01-01T00:00:00.000Z"
+
+
+def catalog_page(index: int, name: str, status: str, last_edited_time: str = OLD_EDIT) -> dict:
+    """a raw page object of the catalog, with the properties of PersistenceServiceItem"""
+    return {
+        "object": "page",
+        "id": f"page-{index}",
+        "created_time": OLD_EDIT,
+        "last_edited_time": last_edited_time,
+        "archived": False,
+        "in_trash": False,
+        "properties": {
+            "Name": {"id": "title", "type": "title", "title": [{"type": "text", "plain_text": name, "text": {"content": name}}]},
+            "Persistence": {"id": "p", "type": "status", "status": {"name": status}},
+            "Persistence Tests": {"id": "t", "type": "checkbox", "checkbox": False},
+            "Primary Owner": {"id": "o", "type": "people", "people": []},
+            "Secondary Owner(s)": {"id": "s", "type": "people", "people": []},
+            "Limitations (synced with docs)": {"id": "l", "type": "rich_text", "rich_text": []},
+            "Exclude from docs": {"id": "e", "type": "checkbox", "checkbox": False},
+        },
+    }
+
+
+class StandInNotion(BaseHTTPRequestHandler):
+    """Answers the database queries with the pages of the server, and records the query of every request"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        query = json.loads(self.rfile.read(int(self.headers["Content-Length"])) or b"{}")
+        self.server.queries.append(query)
+        pages = self.server.pages
+        if query_filter := query.get("filter"):
+            edited_since = datetime.fromisoformat(query_filter["last_edited_time"]["on_or_after"])
+            pages = [
+                page
+                for page in pages
+                if datetime.fromisoformat(page["last_edited_time"].replace("Z", "+00:00")) >= edited_since
+            ]
+        start = int(query.get("start_cursor") or 0)
+        end = start + query.get("page_size", 100)
+        body = json.dumps(
+            {
+                "object": "list",
+                "results": pages[start:end],
+                "has_more": end < len(pages),
+                "next_cursor": str(end) if end < len(pages) else None,
+            }
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInNotion)
+    server.pages = []
+    server.queries = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def statuses(items) -> dict:
+    return {item.name: item.status for item in items}
+
+
+def test_sync():
+    server = start_server()
+    client = NotionClient(auth="stand-in", base_url=f"http://127.0.0.1:{server.server_port}")
+    catalog = PersistenceCatalog(notion_client=client)
+    catalog.default_page_size = 10
+    server.pages = [catalog_page(i, f"service-{i}", "Supported") for i in range(25)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        snapshot_file = os.path.join(tmp_dir, "snapshot.json")
+
+        # first sync: all items are requested, over three pages of results
+        items = catalog.sync(snapshot_file)
+        assert len(items) == 25
+        assert len(server.queries) == 3 and not any("filter" in query for query in server.queries)
+
+        # incremental sync: only the edited item is returned by Notion, the others come from the snapshot
+        server.queries.clear()
+        now = datetime.now(timezone.utc).isoformat()
+        server.pages[3] = catalog_page(3, "service-3", "Not supported", now)
+        server.pages.append(catalog_page(25, "service-25", "Supported", now))
+        server.pages.pop(0)
+        result = statuses(catalog.sync(snapshot_file))
+        assert len(server.queries) == 1 and "filter" in server.queries[0]
+        assert result["service-3"] == "Not supported" and "service-25" in result
+        # a deleted item is not returned by the filtered query, it stays until the next full refresh
+        assert "service-0" in result
+
+        # full refresh: the deleted item is removed from the snapshot
+        server.queries.clear()
+        result = statuses(catalog.sync(snapshot_file, full_refresh=True))
+        assert not any("filter" in query for query in server.queries)
+        assert "service-0" not in result and len(result) == 25
+
+        # the last full refresh is older than max_age: the sync does a full refresh anyway
+        server.pages.pop(0)
+        with open(snapshot_file) as f:
+            snapshot = json.load(f)
+        snapshot["refreshed_at"] = (datetime.now(timezone.utc) - timedelta(days=8)).isoformat()
+        with open(snapshot_file, "w") as f:
+            json.dump(snapshot, f)
+        server.queries.clear()
+        result = statuses(catalog.sync(snapshot_file, max_age=timedelta(days=7)))
+        assert not any("filter" in query for query in server.queries)
+        assert "service-1" not in result and len(result) == 24
+
+        # and the next sync within max_age is incremental again
+        server.queries.clear()
+        assert len(catalog.sync(snapshot_file, max_age=timedelta(days=7))) == 24
+        assert all("filter" in query for query in server.queries)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    test_sync()
+    print("PersistenceCatalog.sync: first sync, incremental sync, full refresh, and max age are working")
@@ -35,8 +35,11 @@ def normalize_path(path):
     return path
 
 
-def generate_redirects_file(config_file, output_file):
-    """Generate CloudFlare _redirects file from JSON config."""
+def generate_redirect_lines(config_file):
+    """
+    Build the lines of the CloudFlare _redirects file from JSON config.
+    Returns the lines and the number of entries skipped because they still need manual review.
+    """
     
     # Load configuration
     with open(config_file, 'r') as f:
@@ -74,6 +77,14 @@ def generate_redirects_file(config_file, output_file):
             
     #         redirects.append(f"{old_path} {new_destination} {status_code}")
     
+    return redirects, skipped_count
+
+
+def generate_redirects_file(config_file, output_file):
+    """Generate CloudFlare _redirects file from JSON config."""
+    
+    redirects, skipped_count = generate_redirect_lines(config_file)
+    
     # Write to output file
     with open(output_file, 'w') as f:
         for redirect in redirects:
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Script to validate redirects offline, without a deployment or any HTTP request.
+Parses the CloudFlare _redirects file, follows the redirects of every old URL in memory (including chains),
+and checks that they end at the expected new URL, and that internal targets are pages of the built site.
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from generate_redirects import generate_redirect_lines, normalize_destination, normalize_path
+
+# longer chains are reported as loops, browsers give up on them as well
+MAX_HOPS = 10
+
+
+def _lookup_key(path: str) -> str:
+    """Key to match a path, the trailing slash is ignored (like in test_redirects.py)."""
+    return path.rstrip('/') if path != '/' else path
+
+
+def parse_redirects(lines: List[str]) -> Dict[str, Tuple[str, int]]:
+    """
+    Parse the lines of a CloudFlare _redirects file.
+
+    Returns:
+        Mapping of the source path (without trailing slash) to (destination, status_code).
+        If a source has more than one rule, the first one wins, like on CloudFlare.
+    """
+    rules = {}
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        fields = line.split()
+        if len(fields) not in (2, 3):
+            raise ValueError(f"Line {number}: expected '<source> <destination> [status]', got '{line}'")
+        source, destination = fields[0], fields[1]
+        status_code = int(fields[2]) if len(fields) == 3 else 302
+        rules.setdefault(_lookup_key(normalize_path(source)), (destination, status_code))
+    return rules
+
+
+def is_external(destination: str) -> bool:
+    """Check if a destination is a full URL instead of a path on the site."""
+    return urlparse(destination).scheme in ('http', 'https')
+
+
+def resolve(path: str, rules: Dict[str, Tuple[str, int]]) -> Tuple[str, List[str], Optional[str]]:
+    """
+    Follow the redirects of a path, the same way a browser would.
+
+    Returns:
+        (final_destination, chain, error) - the chain lists every destination after the path,
+        the error is set if the redirects loop.
+    """
+    chain = []
+    seen = {_lookup_key(path)}
+    destination = path
+    while not is_external(destination):
+        key = _lookup_key(urlparse(destination).path)
+        if key not in rules:
+            break
+        destination = rules[key][0]
+        chain.append(destination)
+        next_key = _lookup_key(urlparse(destination).path)
+        if (not is_external(destination) and next_key in seen) or len(chain) > MAX_HOPS:
+            return destination, chain, f"🔁 Redirect loop: {' -> '.join([path] + chain)}"
+        seen.add(next_key)
+    return destination, chain, None
+
+
+def load_site_pages(site_dir: Path) -> Set[str]:
+    """
+    Collect the paths of all pages in the build output of the site (e.g. dist/aws/services/s3/index.html
+    is the page /aws/services/s3), without trailing slash.
+    """
+    pages = set()
+    for html_file in site_dir.rglob('*.html'):
+        relative = html_file.relative_to(site_dir).with_suffix('')
+        parts = relative.parts[:-1] if relative.name == 'index' else relative.parts
+        pages.add(_lookup_key('/' + '/'.join(parts)))
+    return pages
+
+
+def check_redirects(config_file: Path, rules: Dict[str, Tuple[str, int]], pages: Optional[Set[str]] = None) -> dict:
+    """
+    Check every redirect of the config against the parsed rules, and (if given) the pages of the built site.
+    Returns the results in the same format as RedirectTester.test_all_redirects().
+    """
+    with open(config_file, 'r') as f:
+        config = json.load(f)
+
+    results = {
+        'total': 0,
+        'passed': 0,
+        'failed': 0,
+        'details': []
+    }
+
+    for redirect in config.get('aws', []):
+        # Entries with the manual review note are not in the _redirects file
+        if redirect.get('_note') == "MANUALLY REVIEW AND UPDATE new_link":
+            continue
+
+        old_path = normalize_path(redirect['old_link'])
+        expected = normalize_destination(redirect['new_link'])
+        final, chain, error = resolve(old_path, rules)
+
+        if error:
+            success, message = False, error
+        elif not chain:
+            success, message = False, "❌ No redirect rule"
+        elif (_lookup_key(final) if not is_external(final) else final) != (
+                _lookup_key(expected) if not is_external(expected) else expected):
+            success, message = False, f"❌ Expected: {expected}, Got: {final}"
+        elif pages is not None and not is_external(final) and _lookup_key(urlparse(final).path) not in pages:
+            success, message = False, f"📄 Target page does not exist: {final}"
+        else:
+            success, message = True, "✅ Redirect successful"
+
+        if len(chain) > 1:
+            message += f" (chain: {' -> '.join([old_path] + chain)})"
+
+        results['total'] += 1
+        results['passed' if success else 'failed'] += 1
+        results['details'].append({
+            'product': 'aws',
+            'old_url': old_path,
+            'expected_new_url': expected,
+            'final_url': final,
+            'status_code': rules[_lookup_key(old_path)][1] if chain else 0,
+            'success': success,
+            'message': message
+        })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Validate LocalStack redirects offline')
+    parser.add_argument('--config', default='redirects_config.json',
+                       help='Path to JSON config file (default: redirects_config.json)')
+    parser.add_argument('--redirects',
+                       help='Path to the _redirects file to check (default: generated from the config in memory)')
+    parser.add_argument('--site-dir', default='../../dist',
+                       help='Build output of the site, to check the internal targets (default: ../../dist)')
+
+    args = parser.parse_args()
+
+    config_path = Path(args.config)
+    if not config_path.exists():
+        print(f"❌ Error: Config file '{config_path}' not found!")
+        return 1
+
+    start = time.perf_counter()
+    if args.redirects:
+        with open(args.redirects, 'r') as f:
+            lines = f.read().splitlines()
+        print(f"📄 Redirects file: {args.redirects}")
+    else:
+        lines, _ = generate_redirect_lines(config_path)
+        print(f"📄 Redirects generated from: {config_path}")
+    rules = parse_redirects(lines)
+
+    site_dir = Path(args.site_dir)
+    pages = None
+    if site_dir.is_dir():
+        pages = load_site_pages(site_dir)
+        print(f"🌐 Checking internal targets against {len(pages)} pages in {site_dir}")
+    else:
+        print(f"⚠️  Site directory '{site_dir}' not found, internal targets are not checked (run 'npm run build' first)")
+
+    results = check_redirects(config_path, rules, pages)
+    duration = time.perf_counter() - start
+
+    for detail in results['details']:
+        if not detail['success']:
+            print(f"  {detail['old_url']}")
+            print(f"      {detail['message']}")
+
+    print(f"\n" + "="*50)
+    print(f"📊 RESOLUTION RESULTS SUMMARY")
+    print(f"="*50)
+    print(f"Total redirects: {results['total']}")
+    print(f"Passed: {results['passed']} ✅")
+    print(f"Failed: {results['failed']} ❌")
+    print(f"Checked in {duration * 1000:.0f} ms")
+
+    return 0 if results['failed'] == 0 else 1
+
+
+if __name__ == "__main__":
+    exit(main())
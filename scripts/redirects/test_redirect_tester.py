@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Checks RedirectTester against a local stand-in of the staging environment, without any deployment:
+    python3 -m pytest test_redirect_tester.py
+    python3 test_redirect_tester.py
+The stand-in answers with the redirects of a small config, and fails the first request of some paths with a 503.
+The tester records when each request was sent and how many requests were in flight, on the client side.
+"""
+
+import contextlib
+import io
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from test_redirects import RedirectTester
+
+REDIRECTS = {f"/old/{i}/": f"/aws/new/{i}" for i in range(60)}
+# the first request of these paths fails, the retry succeeds
+FLAKY = {"/old/1/", "/old/2/"}
+# seconds the stand-in needs for each response, so the requests overlap
+RESPONSE_TIME = 0.2
+# the paths with this prefix are slow, and all others are fast
+SLOW_PREFIX, SLOW_RESPONSE_TIME, FAST_RESPONSE_TIME = "/slow/", 1.0, 0.01
+
+
+class StandInStaging(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            first = self.path not in server.seen
+            server.seen.add(self.path)
+        if self.path.startswith(SLOW_PREFIX):
+            time.sleep(SLOW_RESPONSE_TIME)
+        else:
+            time.sleep(RESPONSE_TIME if self.path.startswith('/old/') else FAST_RESPONSE_TIME)
+        if self.path in FLAKY and first:
+            self._respond(503)
+        elif self.path in REDIRECTS:
+            self._respond(301, REDIRECTS[self.path])
+        else:
+            self._respond(200)
+
+    def _respond(self, status_code, location=None):
+        self.send_response(status_code)
+        if location:
+            self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+def start_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInStaging)
+    server.lock = threading.Lock()
+    server.seen = set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = start_server()
+    yield server
+    server.shutdown()
+
+
+class RecordingTester(RedirectTester):
+    """RedirectTester which records when each request is sent, and how many requests are in flight"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.Lock()
+        self.sent = []
+        self.in_flight = self.max_in_flight = 0
+
+    def _get(self, old_path):
+        with self.lock:
+            self.sent.append(time.monotonic())
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return super()._get(old_path)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def run_tester(server, redirects, **options):
+    """runs the tester quietly on the redirects, and returns the tester and the results of test_all_redirects"""
+    server.seen.clear()
+    tester = RecordingTester(f"http://127.0.0.1:{server.server_port}", **options)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_file = Path(tmp_dir, 'redirects_config.json')
+        config_file.write_text(json.dumps({'aws': redirects}))
+        with contextlib.redirect_stdout(io.StringIO()):
+            return tester, tester.test_all_redirects(config_file)
+
+
+def test_results_and_retries(server):
+    redirects = [{'old_link': old, 'new_link': new} for old, new in REDIRECTS.items()]
+    redirects.append({'old_link': '/old/0/', 'new_link': '/aws/somewhere-else'})
+    _, results = run_tester(server, redirects, concurrency=16, rate=0, backoff=0.05)
+    assert results['total'] == 61 and results['passed'] == 60 and results['failed'] == 1
+    # the results are in the order of the config, the flaky paths passed after a retry
+    assert [detail['old_url'] for detail in results['details']] == [r['old_link'] for r in redirects]
+    assert results['details'][1]['success'] and results['details'][2]['success']
+    assert not results['details'][-1]['success']
+
+    _, results = run_tester(server, redirects[:3], concurrency=4, rate=0, retries=0)
+    assert [detail['status_code'] for detail in results['details']] == [200, 503, 503]
+
+
+def test_concurrency(server):
+    # more requests in flight than threads in the default executor of a small CI runner
+    redirects = [{'old_link': old, 'new_link': new} for old, new in REDIRECTS.items() if old not in FLAKY]
+    tester, _ = run_tester(server, redirects, concurrency=40, rate=0)
+    # the default executor has min(32, CPUs + 4) threads, the tester may not have more than 40 requests in flight
+    assert 20 < tester.max_in_flight <= 40, tester.max_in_flight
+
+
+def test_rate_limit(server):
+    # while the slow requests take all slots, the others wait for a free slot: they must not send a burst
+    # of the tokens collected in the meantime once the slots are released
+    redirects = [{'old_link': f"{SLOW_PREFIX}{i}/", 'new_link': f"{SLOW_PREFIX}{i}/"} for i in range(4)]
+    redirects += [{'old_link': f"/page/{i}/", 'new_link': f"/page/{i}/"} for i in range(20)]
+    tester, _ = run_tester(server, redirects, concurrency=4, rate=20)
+    # a burst sends several requests at once, every third request is sent at least one interval (0.05s) later,
+    # while single requests may be delayed by the scheduling of the threads
+    spans = [later - earlier for earlier, later in zip(tester.sent, tester.sent[2:])]
+    assert min(spans) > 1 / 20, min(spans)
+
+
+if __name__ == '__main__':
+    server = start_server()
+    try:
+        for test in (test_results_and_retries, test_concurrency, test_rate_limit):
+            start = time.perf_counter()
+            test(server)
+            print(f"✅ {test.__name__} ({time.perf_counter() - start:.1f}s)")
+    finally:
+        server.shutdown()
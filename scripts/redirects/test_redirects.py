@@ -2,25 +2,72 @@
 """
 Script to test redirects by checking if old URLs redirect to expected new URLs.
 Uses the staging environment to test the redirect behavior.
+
+The redirects are tested concurrently: up to --concurrency requests are in flight over a pooled session,
+--rate limits the requests per second, and failed requests are retried with an exponential backoff.
 """
 
+import asyncio
 import json
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import argparse
+from requests.adapters import HTTPAdapter
 from urllib.parse import urlparse, urljoin
 from pathlib import Path
 import time
 from typing import List, Tuple
 
+# status codes which are worth another try, the staging environment is only temporarily unavailable
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Rate limiter for asyncio tasks: a token is added `rate` times per second, up to `burst` tokens,
+    and every request takes one token. A rate of 0 disables the limit.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Waits until a token is available and takes it."""
+        if self.rate <= 0:
+            return
+        # the waiting tasks are served one after the other, in the order they arrived
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
 
 class RedirectTester:
-    def __init__(self, staging_base_url: str, timeout: int = 10):
+    def __init__(self, staging_base_url: str, timeout: int = 10, concurrency: int = 8, rate: float = 10.0,
+                 retries: int = 2, backoff: float = 0.5):
         self.staging_base_url = staging_base_url.rstrip('/')
         self.timeout = timeout
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'LocalStack-Redirect-Tester/1.0'
         })
+        # one pooled connection per concurrent request, so the connections to the staging host are reused
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
     
     def test_redirect(self, old_path: str, expected_new_path: str) -> Tuple[bool, str, int, str]:
         """
@@ -34,44 +81,8 @@ class RedirectTester:
             (success, final_url, status_code, message)
         """
         try:
-            # Build full staging URL from path
-            staging_url = f"{self.staging_base_url}{old_path}"
-            
-            # Make request with redirect following
-            response = self.session.get(
-                staging_url, 
-                allow_redirects=True, 
-                timeout=self.timeout
-            )
-            
-            final_url = response.url
-            status_code = response.status_code
-            
-            # Determine expected URL based on whether it's external or internal
-            parsed_expected = urlparse(expected_new_path)
-            if parsed_expected.scheme in ('http', 'https'):
-                # External URL - use as-is
-                expected_full_url = expected_new_path
-            else:
-                # Internal path - combine with staging base URL
-                expected_full_url = f"{self.staging_base_url}{expected_new_path}"
-            
-            # Normalize URLs for comparison (handle trailing slashes)
-            def normalize_url_for_comparison(url):
-                """Normalize URL for comparison by removing trailing slash from path"""
-                parsed = urlparse(url)
-                path = parsed.path.rstrip('/') if parsed.path != '/' else parsed.path
-                return f"{parsed.scheme}://{parsed.netloc}{path}{('?' + parsed.query) if parsed.query else ''}{('#' + parsed.fragment) if parsed.fragment else ''}"
-            
-            normalized_final = normalize_url_for_comparison(final_url)
-            normalized_expected = normalize_url_for_comparison(expected_full_url)
-            
-            # Check if redirect worked correctly
-            if normalized_final == normalized_expected:
-                return True, final_url, status_code, "✅ Redirect successful"
-            else:
-                return False, final_url, status_code, f"❌ Expected: {expected_full_url}, Got: {final_url}"
-                
+            response = self._get(old_path)
+            return self._check_response(response, expected_new_path)
         except requests.exceptions.Timeout:
             return False, "", 0, "⏰ Request timeout"
         except requests.exceptions.RequestException as e:
@@ -79,6 +90,88 @@ class RedirectTester:
         except Exception as e:
             return False, "", 0, f"💥 Unexpected error: {str(e)}"
 
+    async def test_redirect_async(self, old_path: str, expected_new_path: str, semaphore: asyncio.Semaphore,
+                                  limiter: TokenBucket, executor: ThreadPoolExecutor) -> Tuple[bool, str, int, str]:
+        """
+        Same as test_redirect, but the request runs in a thread of the executor, so many redirects can be tested at once.
+        Timeouts, connection errors, and the status codes in RETRY_STATUS_CODES are retried up to `retries`
+        times, waiting backoff * 2^attempt seconds before each retry.
+        
+        Args:
+            old_path: Path to test (e.g., "/user-guide/")
+            expected_new_path: Expected redirect path (e.g., "/aws/user-guide/") or external URL
+            semaphore: Limits the number of requests in flight
+            limiter: Limits the number of requests per second
+            executor: Runs the requests, with a thread for each request in flight
+        
+        Returns:
+            (success, final_url, status_code, message)
+        """
+        for attempt in range(self.retries + 1):
+            retry = attempt < self.retries
+            try:
+                async with semaphore:
+                    # the token is only taken once a request can be sent, so the requests waiting for a free slot
+                    # cannot collect tokens and exceed the rate when the slots are released
+                    await limiter.acquire()
+                    response = await asyncio.get_running_loop().run_in_executor(executor, self._get, old_path)
+                if not (retry and response.status_code in RETRY_STATUS_CODES):
+                    return self._check_response(response, expected_new_path)
+            except requests.exceptions.Timeout:
+                if not retry:
+                    return False, "", 0, "⏰ Request timeout"
+            except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+                if not retry:
+                    return False, "", 0, f"🔌 Request failed: {str(e)}"
+            except requests.exceptions.RequestException as e:
+                return False, "", 0, f"🔌 Request failed: {str(e)}"
+            except Exception as e:
+                return False, "", 0, f"💥 Unexpected error: {str(e)}"
+            await asyncio.sleep(self.backoff * 2 ** attempt)
+
+    def _get(self, old_path: str) -> requests.Response:
+        """Requests the path on the staging environment, following all redirects."""
+        # Build full staging URL from path
+        staging_url = f"{self.staging_base_url}{old_path}"
+        
+        # Make request with redirect following
+        response = self.session.get(
+            staging_url, 
+            allow_redirects=True, 
+            timeout=self.timeout
+        )
+        return response
+
+    def _check_response(self, response: requests.Response, expected_new_path: str) -> Tuple[bool, str, int, str]:
+        """Checks if the final URL of the response is expected_new_path, returns (success, final_url, status_code, message)."""
+        final_url = response.url
+        status_code = response.status_code
+        
+        # Determine expected URL based on whether it's external or internal
+        parsed_expected = urlparse(expected_new_path)
+        if parsed_expected.scheme in ('http', 'https'):
+            # External URL - use as-is
+            expected_full_url = expected_new_path
+        else:
+            # Internal path - combine with staging base URL
+            expected_full_url = f"{self.staging_base_url}{expected_new_path}"
+        
+        # Normalize URLs for comparison (handle trailing slashes)
+        def normalize_url_for_comparison(url):
+            """Normalize URL for comparison by removing trailing slash from path"""
+            parsed = urlparse(url)
+            path = parsed.path.rstrip('/') if parsed.path != '/' else parsed.path
+            return f"{parsed.scheme}://{parsed.netloc}{path}{('?' + parsed.query) if parsed.query else ''}{('#' + parsed.fragment) if parsed.fragment else ''}"
+        
+        normalized_final = normalize_url_for_comparison(final_url)
+        normalized_expected = normalize_url_for_comparison(expected_full_url)
+        
+        # Check if redirect worked correctly
+        if normalized_final == normalized_expected:
+            return True, final_url, status_code, "✅ Redirect successful"
+        else:
+            return False, final_url, status_code, f"❌ Expected: {expected_full_url}, Got: {final_url}"
+
     def test_all_redirects(self, config_file: Path) -> dict:
         """Test all redirects from the config file."""
         
@@ -101,20 +194,17 @@ class RedirectTester:
             if skipped_aws > 0:
                 print(f"  ⏭️  Skipping {skipped_aws} AWS redirects with manual review notes")
             
-            for i, redirect in enumerate(aws_redirects, 1):
+            outcomes = asyncio.run(self._test_redirects_concurrently(aws_redirects))
+            
+            for redirect, (success, final_url, status_code, message) in zip(aws_redirects, outcomes):
                 old_path = redirect['old_link']
                 new_path = redirect['new_link']
                 
-                print(f"  [{i}] Testing: {old_path}")
-                success, final_url, status_code, message = self.test_redirect(old_path, new_path)
-                
                 results['total'] += 1
                 if success:
                     results['passed'] += 1
-                    print(f"      {message}")
                 else:
                     results['failed'] += 1
-                    print(f"      {message}")
                 
                 results['details'].append({
                     'product': 'aws',
@@ -125,9 +215,6 @@ class RedirectTester:
                     'success': success,
                     'message': message
                 })
-                
-                # Small delay to be respectful
-                time.sleep(0.5)
         
                  # Test Snowflake redirects
         # if 'snowflake' in config:
@@ -168,6 +255,26 @@ class RedirectTester:
         
         return results
 
+    async def _test_redirects_concurrently(self, redirects: List[dict]) -> List[Tuple[bool, str, int, str]]:
+        """
+        Tests the redirects with up to `concurrency` requests in flight, and at most `rate` requests per second.
+        The results are printed as the tests finish, and returned in the order of the redirects.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limiter = TokenBucket(self.rate)
+        # an own executor, the default one of the event loop would limit the concurrency to its number of threads
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+
+        async def run(i: int, redirect: dict) -> Tuple[bool, str, int, str]:
+            outcome = await self.test_redirect_async(redirect['old_link'], redirect['new_link'], semaphore, limiter,
+                                                     executor)
+            print(f"  [{i}] Tested: {redirect['old_link']}")
+            print(f"      {outcome[3]}")
+            return outcome
+
+        with executor:
+            return await asyncio.gather(*(run(i, redirect) for i, redirect in enumerate(redirects, 1)))
+
     def generate_report(self, results: dict, output_file: str = None):
         """Generate a detailed test report."""
         
@@ -222,6 +329,14 @@ def main():
                        help='Staging base URL (default: https://a5c92421.localstack-docs.pages.dev)')
     parser.add_argument('--timeout', type=int, default=10,
                        help='Request timeout in seconds (default: 10)')
+    parser.add_argument('--concurrency', type=int, default=8,
+                       help='Maximum number of requests in flight (default: 8)')
+    parser.add_argument('--rate', type=float, default=10.0,
+                       help='Maximum requests per second, 0 for no limit (default: 10)')
+    parser.add_argument('--retries', type=int, default=2,
+                       help='Retries of a request after a timeout, connection error, or 429/5xx response (default: 2)')
+    parser.add_argument('--backoff', type=float, default=0.5,
+                       help='Seconds before the first retry, doubled for every further retry (default: 0.5)')
     parser.add_argument('--report', 
                        help='Save detailed report to file (optional)')
     
@@ -235,8 +350,10 @@ def main():
     print(f"🚀 Starting redirect tests...")
     print(f"📍 Staging URL: {args.staging_url}")
     print(f"⚙️  Config file: {config_path}")
+    print(f"🚦 Concurrency: {args.concurrency}, rate limit: {args.rate or 'none'} requests/s")
     
-    tester = RedirectTester(args.staging_url, args.timeout)
+    tester = RedirectTester(args.staging_url, args.timeout, concurrency=args.concurrency, rate=args.rate,
+                            retries=args.retries, backoff=args.backoff)
     
     try:
         results = tester.test_all_redirects(config_path)
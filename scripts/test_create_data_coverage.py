@@ -0,0 +1,157 @@
+"""
+Checks that all modes of create_data_coverage.py generate the same data-templates:
+    python3 -m pytest scripts/test_create_data_coverage.py
+"""
+import csv
+import random
+import tempfile
+from pathlib import Path
+
+from scripts import create_data_coverage
+from scripts.benchmark_data_coverage import RAW_METRICS_HEADER, generate_corpus
+
+
+def _write_csv(path: Path, header: list[str], rows: list[list]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="") as fd:
+        writer = csv.writer(fd)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def _write_implementation_details(impl_dir: Path, operations: dict[str, list[str]]):
+    """writes the implementation details of pro and community, all operations are implemented"""
+    rows = [[service, operation, "True"] for service, ops in operations.items() for operation in ops]
+    for edition in ["pro", "community"]:
+        _write_csv(impl_dir.joinpath(edition, "implementation_coverage_full.csv"), ["service", "operation", "is_implemented"], rows)
+
+
+def _read_output(output_dir: Path) -> dict[str, bytes]:
+    """returns the content of all generated files, by their path relative to output_dir"""
+    return {
+        path.relative_to(output_dir).as_posix(): path.read_bytes()
+        for path in sorted(output_dir.rglob("*"))
+        if path.is_file()
+    }
+
+
+def _generate(impl_dir: Path, raw_dir: Path, output_dir: Path, **options) -> dict[str, bytes]:
+    create_data_coverage.main(str(impl_dir), str(raw_dir), str(output_dir), **options)
+    return _read_output(output_dir)
+
+
+def test_common_service_exception_with_unexpected_response():
+    """
+    the response of a CommonServiceException is not always an object. It is only parsed for the recorded rows, and
+    in all modes a response which is not an object keeps the "CommonServiceException".
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp = Path(tmp_dir)
+        _write_implementation_details(tmp.joinpath("impl"), {"sqs": ["SendMessage", "ReceiveMessage"]})
+        test = "tests/aws/services/sqs/test_sqs.py::TestSqs::test_send"
+        # the response is the last column, so a short row can have the exception without the response
+        header = [column for column in RAW_METRICS_HEADER if column != "response_data"] + ["response_data"]
+        row = dict.fromkeys(header, "")
+        row.update(service="sqs", operation="SendMessage", response_code="400", test_node_id=test, origin="internal")
+        row.update(xfail="False", aws_validated="False", snapshot="False", exception="CommonServiceException")
+
+        def _row(**values) -> list:
+            return list({**row, **values}.values())
+
+        # not recorded: an external test suite, another service, no node-id, or xfail
+        _write_csv(tmp.joinpath("raw", "terraform-test.csv"), header, [_row(response_data='["x"]')])
+        _write_csv(
+            tmp.joinpath("raw", "pro-integration-test.csv"),
+            header,
+            [
+                _row(service="unknown", response_data="null"),
+                _row(test_node_id="", response_data='["x"]'),
+                _row(xfail="True", response_data="null"),
+            ],
+        )
+        # recorded: a list, null, and a short row without the response
+        _write_csv(
+            tmp.joinpath("raw", "community-integration-test.csv"),
+            header,
+            [
+                _row(response_data='["x"]'),
+                _row(operation="ReceiveMessage", response_data="null"),
+                _row(operation="ReceiveMessage", response_data='{"__type": "QueueDoesNotExist"}'),
+                _row(test_node_id=f"{test}[short]")[:-1],
+            ],
+        )
+
+        expected = _generate(tmp.joinpath("impl"), tmp.joinpath("raw"), tmp.joinpath("rows"))
+        template = expected["data/sqs.json"].decode("utf-8")
+        assert '"error": "CommonServiceException"' in template
+        assert '"error": "QueueDoesNotExist"' in template
+        assert "test_send[short]" in template
+        for name, options in {
+            "columnar": {"engine": "columnar"},
+            "cache": {"cache_dir": str(tmp.joinpath("columnar-cache"))},
+            "cached": {"cache_dir": str(tmp.joinpath("columnar-cache"))},
+        }.items():
+            assert _generate(tmp.joinpath("impl"), tmp.joinpath("raw"), tmp.joinpath(name), **options) == expected, name
+
+
+def test_all_modes_generate_the_same_data():
+    """
+    the synthetic corpus of the benchmark, with rows for the services which are collected for other services as well
+    (sqs-query for sqs, rds for neptune and docdb), generates the same data-templates in all modes
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp = Path(tmp_dir)
+        generate_corpus(tmp_dir, services=4, operations=6, files=4, rows=400)
+        rnd = random.Random(0)
+        operations = [f"Operation{i:03d}" for i in range(6)]
+        routed_services = {"sqs": operations, "rds": operations, "neptune": operations[:3], "docdb": operations[3:]}
+        for edition in ["pro", "community"]:
+            # some operations are not implemented, so they are promoted if an internal test calls them
+            with open(tmp.joinpath("implementation", edition, "implementation_coverage_full.csv"), "a", newline="") as fd:
+                writer = csv.writer(fd)
+                writer.writerows(
+                    [service, operation, str(rnd.random() < 0.7)]
+                    for service, ops in {**routed_services, "sqs-query": operations}.items()
+                    for operation in ops
+                )
+        for test_source in ["community-integration-test", "pro-integration-test", "terraform-test"]:
+            rows = []
+            for i in range(200):
+                service = rnd.choice(["sqs-query", "sqs", "rds", "neptune", "docdb"])
+                rows.append(
+                    [
+                        service,
+                        rnd.choice(operations),
+                        "",
+                        rnd.choice(["200", "400", "500", "501"]),
+                        "",
+                        "",
+                        "internal",
+                        f"tests/aws/services/{service}/test_{service}.py::test_{i % 30}" if i % 20 else "",
+                        str(i % 25 == 0),
+                        str(rnd.random() < 0.3),
+                        str(rnd.random() < 0.5),
+                        rnd.choice(["", "all", "$..ResponseMetadata"]),
+                    ]
+                )
+            _write_csv(tmp.joinpath("raw", f"{test_source}-routed.csv"), RAW_METRICS_HEADER, rows)
+
+        def _data(name: str, **options) -> dict[str, bytes]:
+            output = _generate(tmp.joinpath("implementation"), tmp.joinpath("raw"), tmp.joinpath(name), **options)
+            return {path: content for path, content in output.items() if path.startswith("data/")}
+
+        expected = _data("default")
+        for service in ["sqs", "rds", "neptune", "docdb", "service000"]:
+            assert f"data/{service}.json" in expected, service
+        assert "data/sqs-query.json" not in expected
+        for name, options in {
+            "jobs": {"jobs": 2},
+            "columnar": {"engine": "columnar"},
+            "cache": {"cache_dir": str(tmp.joinpath("columnar-cache"))},
+            "cached": {"cache_dir": str(tmp.joinpath("columnar-cache"))},
+            "max-details": {"max_details": 1},
+            "manifest": {"manifest_file": str(tmp.joinpath("manifest.json"))},
+        }.items():
+            assert _data(name, **options) == expected, name
+        # the incremental run, nothing changed since the manifest was written
+        assert _data("manifest", manifest_file=str(tmp.joinpath("manifest.json"))) == expected